@@ -37,6 +37,11 @@ class Settings(BaseSettings):
         default=120,
         description="Timeout in seconds for LLM requests"
     )
+    sql_semantic_cache_threshold: float = Field(
+        default=0.0,
+        description="Cosine similarity above which a near-identical earlier query's "
+                    "SQL is reused (0 disables the embedding cache tier)"
+    )
     
     # ==========================================================================
     # POSTGIS DATABASE
@@ -46,6 +51,24 @@ class Settings(BaseSettings):
     postgres_user: str = Field(default="postgres")
     postgres_password: str = Field(default="postgres")
     postgres_database: str = Field(default="geoml")
+    postgres_pool_min_size: int = Field(
+        default=10,
+        description="Connections kept open in the PostGIS connection pool"
+    )
+    postgres_pool_max_size: int = Field(
+        default=50,
+        description="Maximum connections in the PostGIS connection pool"
+    )
+    use_geom_4326: bool = Field(
+        default=False,
+        description="Read the stored geom_4326 column instead of reprojecting per row "
+                    "(run scripts/optimize_database.py first)"
+    )
+    use_geom_geog: bool = Field(
+        default=False,
+        description="Read the stored geom_geog column in spatial analyses instead of "
+                    "reprojecting per row (run scripts/optimize_database.py first)"
+    )
     
     @property
     def postgres_url(self) -> str:
@@ -6,13 +6,19 @@ Handles all database operations with PostGIS
 =============================================================================
 """
 
+import asyncio
+import io
 import logging
-from typing import Optional, List, Dict, Any, Tuple
+import struct
+import threading
+import weakref
+from typing import Optional, List, Dict, Any, Tuple, Sequence, Iterator
 from contextlib import contextmanager
 
 import psycopg2
 from psycopg2 import sql
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
 import geopandas as gpd
 from shapely import wkt
 from sqlalchemy import create_engine
@@ -21,6 +27,14 @@ from config import settings
 
 logger = logging.getLogger(__name__)
 
+# PostgreSQL binary COPY framing (header: signature, flags, extension length)
+_COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_COPY_BINARY_TRAILER = struct.pack("!h", -1)
+_COPY_BIGINT_ROW = struct.Struct("!hiq")  # 1 field, 8 bytes, int8 value
+
+# Rows fetched per round trip by server-side (named) cursors
+STREAM_ITERSIZE = 50_000
+
 
 class PostGISClient:
     """Client for PostGIS database operations."""
@@ -28,6 +42,10 @@ class PostGISClient:
     def __init__(self, connection_url: Optional[str] = None):
         self.connection_url = connection_url or settings.postgres_url
         self._connection = None
+        self._pool: Optional[ThreadedConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        # Names of statements PREPAREd on each pooled connection
+        self._prepared: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
         
         # Parse connection details for psycopg2
         self.conn_params = {
@@ -40,16 +58,32 @@ class PostGISClient:
         
         logger.info(f"PostGIS client initialized for {settings.postgres_database}")
     
+    def _get_pool(self) -> ThreadedConnectionPool:
+        """
+        Create the connection pool on first use.
+        
+        Long-lived pooled backends also keep PostGIS's per-session PROJ
+        transformation cache warm across queries.
+        """
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadedConnectionPool(
+                        settings.postgres_pool_min_size,
+                        settings.postgres_pool_max_size,
+                        **self.conn_params
+                    )
+        return self._pool
+    
     @contextmanager
     def get_connection(self):
-        """Get a database connection with automatic cleanup."""
-        conn = None
+        """Get a pooled database connection, returned to the pool on exit."""
+        pool = self._get_pool()
+        conn = pool.getconn()
         try:
-            conn = psycopg2.connect(**self.conn_params)
             yield conn
         finally:
-            if conn:
-                conn.close()
+            pool.putconn(conn, close=bool(conn.closed))
     
     @contextmanager
     def get_cursor(self, dict_cursor: bool = True):
@@ -93,6 +127,115 @@ class PostGISClient:
                 return [dict(row) for row in results]
             return []
     
+    async def fetch(self, query: str, *args) -> List[Dict[str, Any]]:
+        """
+        Execute a query from async code without blocking the event loop.
+        
+        Args:
+            query: SQL query string with %s placeholders
+            *args: Values bound to the placeholders
+            
+        Returns:
+            List of result dictionaries
+        """
+        return await asyncio.to_thread(self.execute_query, query, args or None)
+    
+    def execute_prepared(
+        self,
+        name: str,
+        query: str,
+        params: Optional[Sequence] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute a named server-side prepared statement.
+        
+        The statement is PREPAREd the first time it runs on a pooled
+        connection; later calls on that connection only EXECUTE it, skipping
+        parse and plan.
+        
+        Args:
+            name: Statement name (a plain SQL identifier)
+            query: SQL with $1, $2, ... placeholders
+            params: Values bound to the placeholders
+            
+        Returns:
+            List of result dictionaries
+        """
+        params = tuple(params or ())
+        
+        with self.get_connection() as conn:
+            prepared = self._prepared.setdefault(conn, set())
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            try:
+                if name not in prepared:
+                    cursor.execute(f"PREPARE {name} AS {query}")
+                    prepared.add(name)
+                
+                if params:
+                    placeholders = ", ".join(["%s"] * len(params))
+                    cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+                else:
+                    cursor.execute(f"EXECUTE {name}")
+                
+                results = [dict(row) for row in cursor.fetchall()]
+                conn.commit()
+                return results
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+    
+    async def fetch_prepared(self, name: str, query: str, *args) -> List[Dict[str, Any]]:
+        """Async counterpart of execute_prepared."""
+        return await asyncio.to_thread(self.execute_prepared, name, query, args)
+    
+    def execute_query_with_ids(
+        self,
+        query: str,
+        ids: Sequence[int],
+        params: Optional[tuple] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute a query against a temp table of ids loaded via binary COPY.
+        
+        The ids are written to tmp_point_ids(gid) on the same connection, so
+        the query can join against it instead of carrying a large literal
+        IN list that Postgres has to parse.
+        
+        Args:
+            query: SQL query string referencing tmp_point_ids
+            ids: Integer ids to load
+            params: Query parameters (for parameterized queries)
+            
+        Returns:
+            List of result dictionaries
+        """
+        unique_ids = {int(gid) for gid in ids}  # gid is the temp table's PK
+        
+        buf = io.BytesIO()
+        buf.write(_COPY_BINARY_HEADER)
+        for gid in unique_ids:
+            buf.write(_COPY_BIGINT_ROW.pack(1, 8, gid))
+        buf.write(_COPY_BINARY_TRAILER)
+        buf.seek(0)
+        
+        logger.debug(f"Loading {len(unique_ids)} ids into tmp_point_ids via binary COPY")
+        
+        with self.get_cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS tmp_point_ids "
+                "(gid bigint PRIMARY KEY) ON COMMIT DELETE ROWS"
+            )
+            cursor.copy_expert("COPY tmp_point_ids (gid) FROM STDIN BINARY", buf)
+            cursor.execute("ANALYZE tmp_point_ids")
+            cursor.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+    
+    async def fetch_with_ids(self, query: str, ids: Sequence[int], *args) -> List[Dict[str, Any]]:
+        """Async counterpart of execute_query_with_ids (see fetch)."""
+        return await asyncio.to_thread(self.execute_query_with_ids, query, ids, args or None)
+    
     def execute_safe_query(
         self,
         query: str,
@@ -107,18 +250,12 @@ class PostGISClient:
             
         Returns:
             Tuple of (results, was_truncated)
-        """
-        query_upper = query.upper().strip()
-        
-        # Only add LIMIT if:
-        # 1. Query doesn't already have LIMIT
-        # 2. max_rows is not None (user wants a limit)
-        if "LIMIT" not in query_upper and max_rows is not None:
-            # Remove trailing semicolon if present
-            query = query.rstrip(";").strip()
-            query = f"{query} LIMIT {max_rows + 1}"
         
-        results = self.execute_query(query)
+        Rows are collected into a list, so memory grows with the result;
+        callers that can consume rows incrementally should use
+        execute_safe_query_iter instead.
+        """
+        results = list(self.execute_safe_query_iter(query, max_rows=max_rows))
         
         # Check truncation only if we have a limit
         if max_rows is not None:
@@ -130,6 +267,61 @@ class PostGISClient:
         
         return results, was_truncated
     
+    def execute_safe_query_iter(
+        self,
+        query: str,
+        max_rows: Optional[int] = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a query's rows through a server-side cursor.
+        
+        Rows arrive in batches of STREAM_ITERSIZE, so neither libpq nor
+        psycopg2 holds the whole result set at once. Applies the same LIMIT
+        as execute_safe_query (max_rows + 1, to allow truncation checks).
+        
+        Memory stays flat only for consumers that process rows as they
+        arrive; execute_safe_query still collects them into a list. The
+        cursor is planned for reading every row (cursor_tuple_fraction =
+        1.0) rather than PostgreSQL's default of the first 10%, since
+        results are always read to the end; a consumer that stops early
+        may get a slower first batch.
+        
+        Args:
+            query: SQL query string
+            max_rows: Maximum rows to return (None = no limit, return all data)
+            
+        Yields:
+            Result dictionaries
+        """
+        # DECLARE ... CURSOR FOR cannot take a trailing semicolon
+        query = query.strip().rstrip(";").strip()
+        
+        # Only add LIMIT if:
+        # 1. Query doesn't already have LIMIT
+        # 2. max_rows is not None (user wants a limit)
+        if "LIMIT" not in query.upper() and max_rows is not None:
+            query = f"{query} LIMIT {max_rows + 1}"
+        
+        logger.debug(f"Streaming query: {query[:200]}...")
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor(name="safe_query_stream", cursor_factory=RealDictCursor)
+            cursor.itersize = STREAM_ITERSIZE
+            try:
+                # Plan like a plain query that is fetched in full
+                with conn.cursor() as setup:
+                    setup.execute("SET LOCAL cursor_tuple_fraction = 1.0")
+                cursor.execute(query)
+                for row in cursor:
+                    yield dict(row)
+                conn.commit()
+            except BaseException:
+                # Also covers GeneratorExit when the consumer stops early
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+    
     def get_as_geodataframe(
         self,
         query: str,
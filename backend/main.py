@@ -6,6 +6,7 @@ FastAPI backend for geospatial mining database RAG system
 =============================================================================
 """
 
+import asyncio
 import logging
 from typing import Dict, Any, List, Optional
 from contextlib import asynccontextmanager
@@ -13,7 +14,7 @@ import os
 
 from fastapi import FastAPI, HTTPException, UploadFile, File, Query, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 from config import settings
@@ -39,6 +40,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# orjson (optional) - faster serialization of large GeoJSON responses
+try:
+    import orjson  # noqa: F401
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # ML Predictor (optional - won't fail if not installed)
 try:
     from ml import get_mineral_predictor, get_prospectivity_predictor
@@ -94,6 +102,7 @@ app = FastAPI(
     description="Natural language interface for PostGIS mining database",
     version=settings.app_version,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse,
 )
 
 # CORS
@@ -456,12 +465,31 @@ async def download_export(filename: str):
 # Arabic Voice Processor (Whisper + Google Translate + TTS)
 try:
     from voice import get_arabic_voice_processor, VOICE_AVAILABLE
-    ARABIC_VOICE_AVAILABLE = VOICE_AVAILABLE
+    # At import this only says a Whisper backend is installed; whether the
+    # model actually loaded comes from the processor (is_available)
+    ARABIC_VOICE_INSTALLED = VOICE_AVAILABLE
 except ImportError:
-    ARABIC_VOICE_AVAILABLE = False
+    ARABIC_VOICE_INSTALLED = False
     logger.warning("Arabic voice module not available")
 
 
+async def _load_arabic_voice_processor():
+    """Get the Arabic voice processor; the first call loads Whisper, so it runs off the event loop."""
+    return await asyncio.to_thread(get_arabic_voice_processor)
+
+
+async def _require_arabic_voice_processor(
+    detail: str = "Arabic voice processing not available"
+):
+    """Get the Arabic voice processor, or raise 503 when Whisper is not loaded."""
+    if not ARABIC_VOICE_INSTALLED:
+        raise HTTPException(status_code=503, detail=detail)
+    processor = await _load_arabic_voice_processor()
+    if not processor.is_available()["whisper_stt"]:
+        raise HTTPException(status_code=503, detail=detail)
+    return processor
+
+
 class ArabicVoiceRequest(BaseModel):
     """Arabic voice query request."""
     audio_base64: str = Field(..., description="Base64 encoded audio (Arabic speech)")
@@ -479,13 +507,14 @@ async def voice_status():
             "description": "Google Cloud STT/TTS (English/Arabic)"
         },
         "arabic_voice": {
-            "available": ARABIC_VOICE_AVAILABLE,
+            "available": False,
             "description": "Whisper Arabic -> English -> Agent -> Arabic TTS pipeline"
         }
     }
     
-    if ARABIC_VOICE_AVAILABLE:
-        processor = get_arabic_voice_processor()
+    if ARABIC_VOICE_INSTALLED:
+        processor = await _load_arabic_voice_processor()
+        result["arabic_voice"]["available"] = processor.is_available()["whisper_stt"]
         result["arabic_voice"]["details"] = processor.get_status()
     
     return result
@@ -503,11 +532,9 @@ async def arabic_voice_query(request: ArabicVoiceRequest):
     
     Returns both the agent result and Arabic audio response.
     """
-    if not ARABIC_VOICE_AVAILABLE:
-        raise HTTPException(
-            status_code=503, 
-            detail="Arabic voice processing not available. Install: openai-whisper google-cloud-translate google-cloud-texttospeech"
-        )
+    processor = await _require_arabic_voice_processor(
+        detail="Arabic voice processing not available. Install: faster-whisper google-cloud-translate google-cloud-texttospeech"
+    )
     
     import base64 as b64
     
@@ -517,7 +544,6 @@ async def arabic_voice_query(request: ArabicVoiceRequest):
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid audio data: {e}")
     
-    processor = get_arabic_voice_processor()
     orchestrator = get_orchestrator()
     
     # Define agent callback
@@ -546,8 +572,7 @@ async def arabic_transcribe(request: ArabicVoiceRequest):
     - Testing Whisper transcription
     - Getting text before sending to agent
     """
-    if not ARABIC_VOICE_AVAILABLE:
-        raise HTTPException(status_code=503, detail="Arabic voice processing not available")
+    processor = await _require_arabic_voice_processor()
     
     import base64 as b64
     
@@ -556,7 +581,6 @@ async def arabic_transcribe(request: ArabicVoiceRequest):
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid audio data: {e}")
     
-    processor = get_arabic_voice_processor()
     result = await processor.process_arabic_audio(audio_data, audio_format=request.audio_format)
     
     return result
@@ -574,10 +598,8 @@ async def arabic_respond(
     - Converting agent responses to Arabic speech
     - Testing translation and TTS
     """
-    if not ARABIC_VOICE_AVAILABLE:
-        raise HTTPException(status_code=503, detail="Arabic voice processing not available")
+    processor = await _require_arabic_voice_processor()
     
-    processor = get_arabic_voice_processor()
     result = await processor.create_arabic_response(
         english_response=english_text,
         voice_name=voice,
@@ -587,6 +609,31 @@ async def arabic_respond(
     return result
 
 
+@app.post("/api/voice/arabic/respond/stream")
+async def arabic_respond_stream(
+    english_text: str = Query(..., description="English text to convert to Arabic audio"),
+    voice: str = Query(default="ar-XA-Wavenet-B", description="TTS voice")
+):
+    """
+    Stream Arabic MP3 audio for English text.
+    
+    Audio for each sentence chunk is sent as soon as it is synthesized, so
+    playback can start before the whole response has been spoken.
+    """
+    processor = await _require_arabic_voice_processor()
+    
+    if not processor.tts_client:
+        raise HTTPException(status_code=503, detail="Google TTS client not initialized")
+    
+    translate_result = await processor.translate_to_arabic(english_text)
+    arabic_text = translate_result["arabic_text"] if translate_result.get("success") else english_text
+    
+    return StreamingResponse(
+        processor.stream_arabic_speech(arabic_text, voice_name=voice),
+        media_type="audio/mpeg"
+    )
+
+
 @app.post("/api/voice/query")
 async def voice_query(request: VoiceQueryRequest):
     """Process voice query (legacy - English focused)."""
@@ -0,0 +1,118 @@
+"""
+=============================================================================
+GEOSPATIAL RAG - DATABASE OPTIMIZATION SCRIPT
+=============================================================================
+Run this script once (and after reloading data) to add the precomputed
+columns and indexes the analysis queries rely on
+=============================================================================
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database.postgis_client import get_postgis_client
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+# Tables whose SRID 3857 geometry is precomputed in WGS84 (geography and geometry)
+GEOGRAPHY_TABLES = [
+    "mods",
+    "borholes",
+    "surface_samples",
+    "geology_master",
+    "geology_faults_contacts_master",
+]
+
+
+def build_statements() -> list:
+    """Build the DDL statements to run, in order."""
+    statements = []
+    
+    # Geography column generated at write time, so queries don't
+    # ST_Transform every row
+    for table in GEOGRAPHY_TABLES:
+        statements.append(f"""
+            ALTER TABLE {table}
+            ADD COLUMN IF NOT EXISTS geom_geog geography
+            GENERATED ALWAYS AS (ST_Transform(ST_SetSRID(geom, 3857), 4326)::geography) STORED
+        """)
+        statements.append(f"""
+            CREATE INDEX IF NOT EXISTS {table}_geom_geog_idx
+            ON {table} USING GIST (geom_geog)
+        """)
+        # WGS84 geometry read by generated SQL for latitude/longitude and
+        # GeoJSON output when USE_GEOM_4326 is enabled
+        statements.append(f"""
+            ALTER TABLE {table}
+            ADD COLUMN IF NOT EXISTS geom_4326 geometry
+            GENERATED ALWAYS AS (ST_Transform(ST_SetSRID(geom, 3857), 4326)) STORED
+        """)
+        statements.append(f"""
+            CREATE INDEX IF NOT EXISTS {table}_geom_4326_idx
+            ON {table} USING GIST (geom_4326)
+        """)
+    
+    # Near-static lithology area rollup read by the litho_distribution analysis
+    statements.append("""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS mv_litho_distribution AS
+        SELECT
+            COALESCE(litho_fmly, 'Unknown') AS rock_family,
+            COUNT(*) AS unit_count,
+            SUM(ST_Area(geom_geog)) / 1000000 AS total_area_km2
+        FROM geology_master
+        GROUP BY COALESCE(litho_fmly, 'Unknown')
+    """)
+    # Unique index is required for REFRESH ... CONCURRENTLY
+    statements.append("""
+        CREATE UNIQUE INDEX IF NOT EXISTS mv_litho_distribution_rock_family_idx
+        ON mv_litho_distribution (rock_family)
+    """)
+    
+    return statements
+
+
+# Run nightly (cron / Task Scheduler) with --refresh to keep rollups current
+REFRESH_STATEMENTS = [
+    "REFRESH MATERIALIZED VIEW CONCURRENTLY mv_litho_distribution",
+]
+
+
+def main():
+    """Apply the database optimizations."""
+    parser = argparse.ArgumentParser(description="Apply database optimizations")
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Only refresh materialized views (for nightly scheduling)"
+    )
+    args = parser.parse_args()
+    
+    logger.info("Starting database optimization...")
+    
+    db = get_postgis_client()
+    statements = REFRESH_STATEMENTS if args.refresh else build_statements()
+    
+    try:
+        for statement in statements:
+            logger.info(f"Executing: {' '.join(statement.split())[:120]}")
+            db.execute_query(statement, fetch=False)
+        
+        logger.info("✓ Database optimization complete!")
+        
+    except Exception as e:
+        logger.error(f"Database optimization failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,7 @@ from typing import Dict, Any, Optional, Tuple
 from tools.tool1_sql_generator import get_sql_generator
 from tools.spatial_analysis_agent import get_spatial_analysis_agent
 from tools.analysis_visualizer import get_analysis_visualizer
+from tools.tool2_visualizer_2d import geometries_from_wkb
 
 logger = logging.getLogger(__name__)
 
@@ -112,12 +113,11 @@ class GeospatialOrchestrator:
                 data=data,
                 query_type=query_type,
                 tables_used=tables_used,
-                original_query=query
+                original_query=query,
+                sql=result.get("sql_query"),
+                sql_truncated=result.get("was_truncated", False)
             )
             
-            # Store SQL for potential re-use
-            self.analysis_agent.last_sql = result.get("sql_query")
-            
             # Build response
             row_count = result.get("row_count", 0)
             description = result.get("description", "")
@@ -323,7 +323,6 @@ class GeospatialOrchestrator:
         Returns polygons with point counts.
         """
         from database import get_postgis_client
-        import json as json_module
         
         try:
             db = get_postgis_client()
@@ -355,12 +354,12 @@ class GeospatialOrchestrator:
                     g.unit_name,
                     g.litho_fmly,
                     g.main_litho,
-                    ST_AsGeoJSON(
+                    ST_AsBinary(
                         ST_Transform(
                             ST_Simplify(g.geom, 200),
                             4326
                         )
-                    ) AS geojson_geom,
+                    ) AS geom_wkb,
                     COUNT(DISTINCT m.gid) AS point_count
                 FROM geology_master g
                 INNER JOIN mods m ON ST_Intersects(
@@ -386,12 +385,12 @@ class GeospatialOrchestrator:
                     g.unit_name,
                     g.litho_fmly,
                     g.main_litho,
-                    ST_AsGeoJSON(
+                    ST_AsBinary(
                         ST_Transform(
                             ST_Simplify(g.geom, 200),
                             4326
                         )
-                    ) AS geojson_geom,
+                    ) AS geom_wkb,
                     (SELECT COUNT(*) 
                      FROM point_geoms p 
                      WHERE ST_Intersects(
@@ -420,15 +419,12 @@ class GeospatialOrchestrator:
                 logger.warning("Spatial query failed, falling back to name-based matching")
                 return self._fetch_polygons_by_name(point_data)
             
-            # Build polygon features with point counts
+            # Build polygon features with point counts (WKB decoded in one batch)
             polygon_features = []
-            for row in result:
-                if row.get("geojson_geom"):
+            geometries = geometries_from_wkb([row.get("geom_wkb") for row in result])
+            for row, geom in zip(result, geometries):
+                if geom:
                     try:
-                        geom = row["geojson_geom"]
-                        if isinstance(geom, str):
-                            geom = json_module.loads(geom)
-                        
                         polygon_features.append({
                             "type": "Feature",
                             "geometry": geom,
@@ -468,7 +464,6 @@ class GeospatialOrchestrator:
     def _fetch_polygons_by_name(self, point_data: list) -> Optional[Dict[str, Any]]:
         """Fallback method: Fetch polygons by matching unit names."""
         from database import get_postgis_client
-        import json as json_module
         
         try:
             db = get_postgis_client()
@@ -506,12 +501,12 @@ class GeospatialOrchestrator:
                 unit_name,
                 litho_fmly,
                 main_litho,
-                ST_AsGeoJSON(
+                ST_AsBinary(
                     ST_Transform(
                         ST_Simplify(geom, 200),
                         4326
                     )
-                ) AS geojson_geom
+                ) AS geom_wkb
             FROM geology_master
             WHERE unit_name IN ('{names_list}')
             LIMIT 500;
@@ -522,15 +517,12 @@ class GeospatialOrchestrator:
             if not result:
                 return None
             
-            # Build polygon features with point counts
+            # Build polygon features with point counts (WKB decoded in one batch)
             polygon_features = []
-            for row in result:
-                if row.get("geojson_geom"):
+            geometries = geometries_from_wkb([row.get("geom_wkb") for row in result])
+            for row, geom in zip(result, geometries):
+                if geom:
                     try:
-                        geom = row["geojson_geom"]
-                        if isinstance(geom, str):
-                            geom = json_module.loads(geom)
-                        
                         unit_name = row.get("unit_name", "Unknown")
                         point_count = geology_counts.get(unit_name, 0)
                         
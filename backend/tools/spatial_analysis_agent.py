@@ -10,15 +10,142 @@ Smart analysis suggester that:
 =============================================================================
 """
 
+import asyncio
 import logging
+import math
+import re
+import threading
+import time
 from typing import Dict, Any, List, Optional, Tuple
 from collections import Counter
 import json
 
+from shapely import wkb
+from shapely.geometry import mapping
+
+from config import settings
 from database.postgis_client import get_postgis_client
 
 logger = logging.getLogger(__name__)
 
+# scikit-learn is optional - without it clustering runs ST_ClusterDBSCAN in PostGIS
+try:
+    import numpy as np
+    from scipy.sparse import csr_matrix
+    from sklearn.cluster import DBSCAN
+    from sklearn.neighbors import NearestNeighbors
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+    logger.info("scikit-learn not available - clustering will use ST_ClusterDBSCAN")
+
+# Mean Earth radius used to convert km to haversine radians
+EARTH_RADIUS_KM = 6371.0088
+
+# Seconds to reuse results of the whole-table aggregate analyses
+QUERY_CACHE_TTL = 300
+
+# Above this many point IDs the ID list is sent via binary COPY into a temp
+# table instead of being inlined as an IN (...) literal
+POINT_IDS_COPY_THRESHOLD = 5000
+
+# Source SQL is only re-applied when it reads one point table with no row
+# limit, so re-running it selects exactly the analysed rows
+_RE_SQL_ROW_LIMIT = re.compile(r'\b(limit|offset|fetch)\b', re.IGNORECASE)
+_RE_SQL_JOIN = re.compile(r'\bjoin\b', re.IGNORECASE)
+_RE_SQL_FROM_TABLE = re.compile(r'\bfrom\s+(\w+)', re.IGNORECASE)
+_RE_SQL_COMMA_JOIN = re.compile(r'\bfrom\s+\w+(\s+(as\s+)?\w+)?\s*,', re.IGNORECASE)
+
+# Shapes with at least this many vertices come back as WKB instead of
+# ST_AsGeoJSON text (binary is far smaller for detailed hulls)
+SHAPE_WKB_MIN_VERTICES = 20
+
+# Web Mercator sphere radius (SRID 3857), for projecting lat/lon client-side
+WEB_MERCATOR_RADIUS_M = 6378137.0
+
+
+def geog_expr(alias: str = "") -> str:
+    """
+    Geography (WGS84) expression for a table's SRID 3857 geom.
+    
+    Reads the stored geom_geog column (scripts/optimize_database.py) when
+    settings.use_geom_geog is enabled, otherwise reprojects per row.
+    """
+    prefix = f"{alias}." if alias else ""
+    if settings.use_geom_geog:
+        return f"{prefix}geom_geog"
+    return f"ST_Transform(ST_SetSRID({prefix}geom, 3857), 4326)::geography"
+
+
+def wgs84_expr(alias: str = "") -> str:
+    """WGS84 geometry expression for a table's geom, for ST_X/ST_Y (see geog_expr)."""
+    prefix = f"{alias}." if alias else ""
+    if settings.use_geom_geog:
+        return f"{prefix}geom_geog::geometry"
+    return f"ST_Transform(ST_SetSRID({prefix}geom, 3857), 4326)"
+
+
+def as_gid(value: Any) -> Optional[int]:
+    """Coerce a row's gid to int; None when it is missing or not an integer."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def hull_candidate_ids(rows: List[Dict]) -> Optional[List[int]]:
+    """
+    Drop points that cannot lie on the convex hull (Akl-Toussaint).
+    
+    The 8 extreme points in x, y, x+y and x-y (SRID 3857) form an octagon;
+    points strictly inside it are interior to the hull. Returns None when
+    some row lacks coordinates, so the caller keeps all IDs.
+    """
+    points = []
+    for r in rows:
+        gid, lat, lon = as_gid(r.get("gid")), r.get("latitude"), r.get("longitude")
+        if lat is None or lon is None:
+            return None
+        if gid is not None:
+            lat_rad = math.radians(max(min(float(lat), 85.0), -85.0))
+            points.append((
+                gid,
+                WEB_MERCATOR_RADIUS_M * math.radians(float(lon)),
+                WEB_MERCATOR_RADIUS_M * math.log(math.tan(math.pi / 4 + lat_rad / 2))
+            ))
+    
+    # Counter-clockwise: left, bottom-left, bottom, bottom-right,
+    # right, top-right, top, top-left
+    octagon = [
+        min(points, key=lambda p: p[1]),
+        min(points, key=lambda p: p[1] + p[2]),
+        min(points, key=lambda p: p[2]),
+        max(points, key=lambda p: p[1] - p[2]),
+        max(points, key=lambda p: p[1]),
+        max(points, key=lambda p: p[1] + p[2]),
+        max(points, key=lambda p: p[2]),
+        min(points, key=lambda p: p[1] - p[2]),
+    ]
+    vertices = []
+    for p in octagon:
+        if not vertices or (p[1], p[2]) != (vertices[-1][1], vertices[-1][2]):
+            vertices.append(p)
+    if len(vertices) > 1 and (vertices[0][1], vertices[0][2]) == (vertices[-1][1], vertices[-1][2]):
+        vertices.pop()
+    if len(vertices) < 3:
+        return [p[0] for p in points]
+    
+    edges = [
+        (a[1], a[2], b[1] - a[1], b[2] - a[2])
+        for a, b in zip(vertices, vertices[1:] + vertices[:1])
+    ]
+    return [
+        p[0] for p in points
+        if not all(dx * (p[2] - ay) - dy * (p[1] - ax) > 0 for ax, ay, dx, dy in edges)
+    ]
+
 
 # =============================================================================
 # ANALYSIS DEFINITIONS BY DATA TYPE
@@ -131,6 +258,63 @@ POLYGON_ANALYSES = {
     }
 }
 
+# Whole-table queries run as server-side prepared statements (see _cached_statement)
+STATIC_STATEMENTS = {
+    "total_length": f"""
+        SELECT 
+            ROUND((SUM(ST_Length({geog_expr()})) / 1000)::numeric, 2) as total_length_km,
+            COUNT(*) as line_count
+        FROM geology_faults_contacts_master
+    """,
+    # Rollup is precomputed by scripts/optimize_database.py
+    "litho_distribution": """
+        SELECT 
+            rock_family,
+            unit_count,
+            ROUND(total_area_km2::numeric, 0) as total_area_km2
+        FROM mv_litho_distribution
+        ORDER BY total_area_km2 DESC
+        LIMIT 15
+    """,
+    # Live aggregate for databases where the view hasn't been created;
+    # grouped the same way as mv_litho_distribution
+    "litho_distribution_live": """
+        SELECT 
+            COALESCE(litho_fmly, 'Unknown') as rock_family,
+            COUNT(*) as unit_count,
+            ROUND((SUM(ST_Area(ST_Transform(ST_SetSRID(geom, 3857), 4326)::geography)) / 1000000)::numeric, 0) as total_area_km2
+        FROM geology_master
+        GROUP BY COALESCE(litho_fmly, 'Unknown')
+        ORDER BY total_area_km2 DESC
+        LIMIT 15
+    """,
+}
+
+# Tables point analyses may query by gid
+POINT_TABLES = ("mods", "borholes", "surface_samples")
+
+# Analysis key -> coroutine method on SpatialAnalysisAgent
+ANALYSIS_HANDLERS = {
+    # Point analyses
+    "clustering": "_run_clustering",
+    "density": "_run_density",
+    "regional": "_run_regional",
+    "commodity": "_run_commodity",
+    "nearest_neighbor": "_run_nearest_neighbor",
+    "distance_to_faults": "_run_distance_to_faults",
+    "geology_correlation": "_run_geology_correlation",
+    "bounding_area": "_run_bounding_area",
+    # Line analyses
+    "total_length": "_run_total_length",
+    "orientation": "_run_orientation",
+    "intersections": "_run_intersections",
+    "buffer_zones": "_run_buffer_zones",
+    # Polygon analyses
+    "area_stats": "_run_area_stats",
+    "coverage": "_run_coverage",
+    "litho_distribution": "_run_litho_distribution",
+}
+
 
 class SpatialAnalysisAgent:
     """
@@ -144,7 +328,17 @@ class SpatialAnalysisAgent:
         self.last_query_type = None
         self.last_tables_used = []
         self.last_sql = None
+        self._last_sql_data = None    # rows last_sql produced
         self.analysis_pending = False
+        
+        # Clustering cache: subset rows and radius-neighbor graph for the
+        # last point set, so re-clustering with a new distance skips Postgres
+        self._cluster_points = None   # (points_key, rows)
+        self._radius_graph = None     # (points_key, max_eps, csr_matrix)
+        
+        # Results of parameterless whole-table queries:
+        # STATIC_STATEMENTS name -> (timestamp, rows)
+        self._query_cache = {}
     
     # =========================================================================
     # DATA TYPE DETECTION
@@ -191,15 +385,23 @@ class SpatialAnalysisAgent:
         data: List[Dict],
         query_type: str,
         tables_used: List[str],
-        original_query: str = ""
+        original_query: str = "",
+        sql: Optional[str] = None,
+        sql_truncated: bool = False
     ) -> Dict[str, Any]:
         """
         Get suggested analyses based on the data returned.
         Only offers analysis for POINT data to avoid breaking line/polygon queries.
+        
+        sql is the query that produced data; analyses may re-apply it
+        server-side instead of shipping every gid back. It is ignored when
+        sql_truncated is set, since re-running it would return more rows.
         """
         self.last_query_data = data
         self.last_query_type = query_type
         self.last_tables_used = tables_used
+        self.last_sql = None if sql_truncated else sql
+        self._last_sql_data = data
         
         data_type = self.detect_data_type(data, query_type)
         row_count = len(data)
@@ -451,47 +653,7 @@ class SpatialAnalysisAgent:
         try:
             params = custom_params or {}
             
-            # Point analyses
-            if analysis_key == "clustering":
-                result = await self._run_clustering(params)
-            elif analysis_key == "density":
-                result = await self._run_density(params)
-            elif analysis_key == "regional":
-                result = await self._run_regional(params)
-            elif analysis_key == "commodity":
-                result = await self._run_commodity(params)
-            elif analysis_key == "nearest_neighbor":
-                result = await self._run_nearest_neighbor(params)
-            elif analysis_key == "distance_to_faults":
-                result = await self._run_distance_to_faults(params)
-            elif analysis_key == "geology_correlation":
-                result = await self._run_geology_correlation(params)
-            elif analysis_key == "bounding_area":
-                result = await self._run_bounding_area(params)
-            
-            # Line analyses
-            elif analysis_key == "total_length":
-                result = await self._run_total_length(params)
-            elif analysis_key == "orientation":
-                result = await self._run_orientation(params)
-            elif analysis_key == "intersections":
-                result = await self._run_intersections(params)
-            elif analysis_key == "buffer_zones":
-                result = await self._run_buffer_zones(params)
-            
-            # Polygon analyses
-            elif analysis_key == "area_stats":
-                result = await self._run_area_stats(params)
-            elif analysis_key == "coverage":
-                result = await self._run_coverage(params)
-            elif analysis_key == "litho_distribution":
-                result = await self._run_litho_distribution(params)
-            
-            else:
-                result = {
-                    "success": False,
-                    "error": f"Unknown analysis type: {analysis_key}"
-                }
+            result = await self._dispatch_analysis(analysis_key, params)
             
             # Ensure result uses the analysis_data
             if result.get("success") and "data" not in result:
@@ -503,48 +665,208 @@ class SpatialAnalysisAgent:
             # Restore original data
             self.last_query_data = original_data
     
+    async def run_all(
+        self,
+        analyses: List[str],
+        params: Dict[str, Any] = None,
+        data: list = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Run several analyses concurrently on the same data.
+        
+        Each analysis issues its own pooled query, so overlapping them lets
+        network and server time run in parallel instead of back-to-back.
+        
+        Args:
+            analyses: Analysis keys to run (duplicates are run once)
+            params: Parameters shared by all analyses
+            data: Data to analyze (if None, uses last_query_data)
+        
+        Returns:
+            Mapping of analysis key -> result dict (same shape as run_analysis)
+        """
+        keys = list(dict.fromkeys(analyses))
+        analysis_data = data if data is not None else self.last_query_data
+        
+        if not analysis_data:
+            error = "No data available for analysis. Run a query first or provide data."
+            return {key: {"success": False, "error": error} for key in keys}
+        
+        original_data = self.last_query_data
+        self.last_query_data = analysis_data
+        
+        try:
+            params = params or {}
+            
+            if hasattr(asyncio, "TaskGroup"):
+                async with asyncio.TaskGroup() as tg:
+                    tasks = [tg.create_task(self._dispatch_analysis(key, params)) for key in keys]
+                results = [task.result() for task in tasks]
+            else:
+                # Python 3.10: no TaskGroup
+                results = await asyncio.gather(
+                    *(self._dispatch_analysis(key, params) for key in keys)
+                )
+            
+            for result in results:
+                if result.get("success") and "data" not in result:
+                    result["data"] = analysis_data
+            
+            return dict(zip(keys, results))
+            
+        finally:
+            self.last_query_data = original_data
+    
+    async def _dispatch_analysis(self, analysis_key: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Route an analysis key to its _run_* coroutine."""
+        handler = ANALYSIS_HANDLERS.get(analysis_key)
+        if handler is None:
+            return {
+                "success": False,
+                "error": f"Unknown analysis type: {analysis_key}"
+            }
+        return await getattr(self, handler)(params)
+    
+    async def _cached_statement(self, name: str, ttl: float = QUERY_CACHE_TTL) -> List[Dict]:
+        """Run a parameterless prepared statement, reusing its result for ttl seconds."""
+        cached = self._query_cache.get(name)
+        now = time.monotonic()
+        if cached is not None and now - cached[0] < ttl:
+            return cached[1]
+        
+        results = await self.db.fetch_prepared(f"sa_{name}", STATIC_STATEMENTS[name])
+        self._query_cache[name] = (now, results)
+        return results
+    
+    def clear_query_cache(self):
+        """Drop cached whole-table results (e.g. after reloading tables)."""
+        self._query_cache.clear()
+    
     # =========================================================================
     # POINT ANALYSES
     # =========================================================================
     
+    def _primary_table(self, default: str = "mods") -> str:
+        """
+        Point table the current analysis data came from.
+        
+        Only whitelisted point tables are returned, since the name is
+        interpolated into SQL.
+        """
+        for table in self.last_tables_used:
+            if table in POINT_TABLES:
+                return table
+        return default
+    
+    def _source_filter(self) -> Optional[str]:
+        """
+        WHERE predicate selecting the current rows by re-running the query
+        that produced them, or None when that SQL is unknown or unusable.
+        
+        Only a plain SELECT over the primary point table with no LIMIT,
+        OFFSET or FETCH qualifies: anything else may return different rows
+        on re-execution, or a gid from another table.
+        """
+        if not self.last_sql or self.last_query_data is not self._last_sql_data:
+            return None
+        source = self.last_sql.strip().rstrip(";").strip()
+        if ";" in source or not source.lower().startswith("select"):
+            return None
+        if _RE_SQL_ROW_LIMIT.search(source) or _RE_SQL_JOIN.search(source) or _RE_SQL_COMMA_JOIN.search(source):
+            return None
+        table = self._primary_table()
+        if any(t.lower() != table for t in _RE_SQL_FROM_TABLE.findall(source)):
+            return None
+        return f"gid IN (SELECT gid FROM ({source}) AS source_rows)"
+    
+    def _point_ids(self) -> List[int]:
+        """
+        Integer gids of the current analysis data.
+        
+        Rows whose gid is missing or non-numeric are skipped, so only
+        validated ints are ever bound into the gid filter.
+        """
+        point_ids = []
+        for r in self.last_query_data:
+            gid = as_gid(r.get("gid"))
+            if gid is not None:
+                point_ids.append(gid)
+        return point_ids
+    
+    def _point_filter(self, point_ids: List[int]) -> str:
+        """WHERE predicate restricting gid to the given point IDs."""
+        if len(point_ids) > POINT_IDS_COPY_THRESHOLD:
+            return "gid IN (SELECT gid FROM tmp_point_ids)"
+        return "gid = ANY(%s::int[])"
+    
+    async def _execute_point_query(
+        self,
+        sql: str,
+        point_ids: List[int],
+        extra_params: tuple = ()
+    ) -> List[Dict]:
+        """
+        Execute a query built with _point_filter for the same point IDs.
+        
+        extra_params bind placeholders that appear after the point filter.
+        """
+        if len(point_ids) > POINT_IDS_COPY_THRESHOLD:
+            return await self.db.fetch_with_ids(sql, point_ids, *extra_params)
+        # One int[] parameter instead of a hand-built IN (...) string; psycopg2
+        # still interpolates it client-side, so no server plan is reused
+        return await self.db.fetch(sql, list(point_ids), *extra_params)
+    
     async def _run_clustering(self, params: Dict) -> Dict[str, Any]:
         """Run DBSCAN clustering analysis."""
         distance_km = float(params.get("distance_km", 5))  # Ensure it's a float
-        min_points = params.get("min_points", 2)
+        min_points = int(params.get("min_points", 2))
         
-        # Convert km to meters (geometry is in SRID 3857 which uses meters)
+        # Both paths measure ground distance: haversine in scikit-learn, UTM
+        # metres in PostGIS (SRID 3857 metres stretch by 1/cos(latitude))
         distance_m = distance_km * 1000
         
         logger.info(f"Running clustering with distance: {distance_km} km ({distance_m} m)")
         
         # Get point IDs from last query
-        point_ids = [r.get("gid") for r in self.last_query_data if r.get("gid")]
+        point_ids = self._point_ids()
         
         if not point_ids:
             return {"success": False, "error": "No valid point IDs found"}
         
-        table = self.last_tables_used[0] if self.last_tables_used else "mods"
-        
-        sql = f"""
-            WITH subset AS (
-                SELECT gid, geom, 
-                    COALESCE(eng_name, '') as name,
-                    COALESCE(major_comm, '') as commodity,
-                    COALESCE(region, '') as region,
-                    ST_Y(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS latitude,
-                    ST_X(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS longitude
-                FROM {table}
-                WHERE gid IN ({','.join(map(str, point_ids))})
-            )
-            SELECT 
-                ST_ClusterDBSCAN(geom, eps := {distance_m}, minpoints := {min_points}) OVER() AS cluster_id,
-                gid, name, commodity, region, latitude, longitude
-            FROM subset
-            ORDER BY cluster_id NULLS LAST
-        """
+        table = self._primary_table()
         
         try:
-            results = self.db.execute_query(sql)
+            if SKLEARN_AVAILABLE:
+                results = await self._cluster_with_radius_graph(table, point_ids, distance_km, min_points)
+            else:
+                sql = f"""
+                    WITH subset AS (
+                        SELECT gid, geom, 
+                            COALESCE(eng_name, '') as name,
+                            COALESCE(major_comm, '') as commodity,
+                            COALESCE(region, '') as region,
+                            ST_Y({wgs84_expr()}) AS latitude,
+                            ST_X({wgs84_expr()}) AS longitude
+                        FROM {table}
+                        WHERE {self._point_filter(point_ids)}
+                    ),
+                    utm AS (
+                        -- WGS84 UTM zone of the subset's mean longitude
+                        SELECT CASE WHEN AVG(latitude) < 0 THEN 32700 ELSE 32600 END
+                            + LEAST(GREATEST(FLOOR((AVG(longitude) + 180) / 6)::int + 1, 1), 60) AS srid
+                        FROM subset
+                    )
+                    SELECT 
+                        ST_ClusterDBSCAN(
+                            ST_Transform(ST_SetSRID(s.geom, 3857), utm.srid),
+                            eps := {distance_m}, minpoints := {min_points}
+                        ) OVER() AS cluster_id,
+                        s.gid, s.name, s.commodity, s.region, s.latitude, s.longitude
+                    FROM subset s
+                    CROSS JOIN utm
+                    ORDER BY cluster_id NULLS LAST
+                """
+                results = await self._execute_point_query(sql, point_ids)
             
             # Analyze clusters
             cluster_counts = Counter(r.get("cluster_id") for r in results if r.get("cluster_id") is not None)
@@ -598,6 +920,67 @@ class SpatialAnalysisAgent:
             logger.error(f"Clustering analysis failed: {e}")
             return {"success": False, "error": str(e)}
     
+    async def _cluster_with_radius_graph(
+        self,
+        table: str,
+        point_ids: List[int],
+        distance_km: float,
+        min_points: int
+    ) -> List[Dict]:
+        """
+        DBSCAN over a cached haversine radius-neighbor graph.
+        
+        The subset rows and the sparse graph are kept for the last point set.
+        A new distance no larger than the cached radius only thresholds the
+        graph; a larger one rebuilds it. Neither touches Postgres again.
+        """
+        points_key = hash((table, tuple(point_ids)))
+        
+        if self._cluster_points is None or self._cluster_points[0] != points_key:
+            sql = f"""
+                SELECT gid,
+                    COALESCE(eng_name, '') as name,
+                    COALESCE(major_comm, '') as commodity,
+                    COALESCE(region, '') as region,
+                    ST_Y({wgs84_expr()}) AS latitude,
+                    ST_X({wgs84_expr()}) AS longitude
+                FROM {table}
+                WHERE {self._point_filter(point_ids)}
+            """
+            self._cluster_points = (points_key, await self._execute_point_query(sql, point_ids))
+            self._radius_graph = None
+        
+        rows = self._cluster_points[1]
+        if not rows:
+            return []
+        
+        eps = distance_km / EARTH_RADIUS_KM
+        
+        if self._radius_graph is not None and eps <= self._radius_graph[1]:
+            # Keep only edges within the new radius (explicit zeros are
+            # duplicate/self points and must stay neighbors)
+            graph = self._radius_graph[2].tocoo()
+            keep = graph.data <= eps
+            graph = csr_matrix(
+                (graph.data[keep], (graph.row[keep], graph.col[keep])),
+                shape=graph.shape
+            )
+        else:
+            coords = np.radians([[float(r["latitude"]), float(r["longitude"])] for r in rows])
+            graph = NearestNeighbors(
+                radius=eps, metric="haversine", algorithm="ball_tree"
+            ).fit(coords).radius_neighbors_graph(coords, mode="distance")
+            self._radius_graph = (points_key, eps, graph)
+        
+        labels = DBSCAN(eps=eps, min_samples=min_points, metric="precomputed").fit(graph).labels_
+        
+        results = [
+            {"cluster_id": int(label) if label >= 0 else None, **row}
+            for label, row in zip(labels, rows)
+        ]
+        results.sort(key=lambda r: (r["cluster_id"] is None, r["cluster_id"] or 0))
+        return results
+    
     def _build_clustering_summary(
         self,
         num_clusters: int,
@@ -628,12 +1011,12 @@ class SpatialAnalysisAgent:
     
     async def _run_regional(self, params: Dict) -> Dict[str, Any]:
         """Run regional distribution analysis."""
-        point_ids = [r.get("gid") for r in self.last_query_data if r.get("gid")]
+        point_ids = self._point_ids()
         
         if not point_ids:
             return {"success": False, "error": "No valid point IDs found"}
         
-        table = self.last_tables_used[0] if self.last_tables_used else "mods"
+        table = self._primary_table()
         
         sql = f"""
             SELECT 
@@ -641,13 +1024,13 @@ class SpatialAnalysisAgent:
                 COUNT(*) as count,
                 ROUND(100.0 * COUNT(*) / SUM(COUNT(*)) OVER(), 1) as percentage
             FROM {table}
-            WHERE gid IN ({','.join(map(str, point_ids))})
+            WHERE {self._point_filter(point_ids)}
             GROUP BY region
             ORDER BY count DESC
         """
         
         try:
-            results = self.db.execute_query(sql)
+            results = await self._execute_point_query(sql, point_ids)
             
             summary_text = self._build_regional_summary(results)
             
@@ -681,7 +1064,7 @@ class SpatialAnalysisAgent:
     
     async def _run_commodity(self, params: Dict) -> Dict[str, Any]:
         """Run commodity breakdown analysis."""
-        point_ids = [r.get("gid") for r in self.last_query_data if r.get("gid")]
+        point_ids = self._point_ids()
         
         if not point_ids:
             return {"success": False, "error": "No valid point IDs found"}
@@ -692,13 +1075,13 @@ class SpatialAnalysisAgent:
                 COUNT(*) as count,
                 ROUND(100.0 * COUNT(*) / SUM(COUNT(*)) OVER(), 1) as percentage
             FROM mods
-            WHERE gid IN ({','.join(map(str, point_ids))})
+            WHERE {self._point_filter(point_ids)}
             GROUP BY major_comm
             ORDER BY count DESC
         """
         
         try:
-            results = self.db.execute_query(sql)
+            results = await self._execute_point_query(sql, point_ids)
             
             lines = [
                 f"💎 **Commodity Breakdown**",
@@ -723,33 +1106,30 @@ class SpatialAnalysisAgent:
     
     async def _run_distance_to_faults(self, params: Dict) -> Dict[str, Any]:
         """Calculate distance from points to nearest faults."""
-        point_ids = [r.get("gid") for r in self.last_query_data if r.get("gid")]
+        point_ids = self._point_ids()
         
         if not point_ids:
             return {"success": False, "error": "No valid point IDs found"}
         
-        table = self.last_tables_used[0] if self.last_tables_used else "mods"
+        table = self._primary_table()
         
         sql = f"""
             WITH points AS (
                 SELECT gid, 
                     COALESCE(eng_name, '') as name,
-                    geom,
-                    ST_Y(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS latitude,
-                    ST_X(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS longitude
+                    {geog_expr()} AS geom_geog,
+                    ST_Y({wgs84_expr()}) AS latitude,
+                    ST_X({wgs84_expr()}) AS longitude
                 FROM {table}
-                WHERE gid IN ({','.join(map(str, point_ids))})
+                WHERE {self._point_filter(point_ids)}
             ),
             faults AS (
-                SELECT geom FROM geology_faults_contacts_master
-                WHERE newtype ILIKE '%fault%'
+                SELECT {geog_expr()} AS geom_geog FROM geology_faults_contacts_master
+                WHERE newtype ~* 'fault'
             )
             SELECT 
                 p.gid, p.name, p.latitude, p.longitude,
-                ROUND((MIN(ST_Distance(
-                    ST_Transform(ST_SetSRID(p.geom, 3857), 4326)::geography,
-                    ST_Transform(ST_SetSRID(f.geom, 3857), 4326)::geography
-                )) / 1000)::numeric, 2) AS distance_to_fault_km
+                ROUND((MIN(ST_Distance(p.geom_geog, f.geom_geog)) / 1000)::numeric, 2) AS distance_to_fault_km
             FROM points p
             CROSS JOIN faults f
             GROUP BY p.gid, p.name, p.latitude, p.longitude
@@ -757,7 +1137,7 @@ class SpatialAnalysisAgent:
         """
         
         try:
-            results = self.db.execute_query(sql)
+            results = await self._execute_point_query(sql, point_ids)
             
             if results:
                 distances = [float(r.get("distance_to_fault_km", 0)) for r in results]
@@ -798,52 +1178,153 @@ class SpatialAnalysisAgent:
     
     async def _run_geology_correlation(self, params: Dict) -> Dict[str, Any]:
         """Find which geology units contain the points."""
-        point_ids = [r.get("gid") for r in self.last_query_data if r.get("gid")]
+        point_ids = self._point_ids()
         
         if not point_ids:
             return {"success": False, "error": "No valid point IDs found"}
         
-        table = self.last_tables_used[0] if self.last_tables_used else "mods"
+        table = self._primary_table()
         
         sql = f"""
             WITH points AS (
                 SELECT gid, geom FROM {table}
-                WHERE gid IN ({','.join(map(str, point_ids))})
+                WHERE {self._point_filter(point_ids)}
             )
             SELECT 
                 COALESCE(g.unit_name, 'Unknown') as geology_unit,
                 COALESCE(g.main_litho, 'Unknown') as lithology,
                 COALESCE(g.litho_fmly, 'Unknown') as rock_family,
                 COUNT(*) as point_count,
-                ROUND(100.0 * COUNT(*) / SUM(COUNT(*)) OVER(), 1) as percentage
+                ROUND(100.0 * COUNT(*) / SUM(COUNT(*)) OVER(), 1) as percentage,
+                COUNT(*) OVER() as unit_total
             FROM points p
-            JOIN geology_master g ON ST_Intersects(
-                ST_Transform(ST_SetSRID(p.geom, 3857), 4326),
-                ST_Transform(ST_SetSRID(g.geom, 3857), 4326)
-            )
+            JOIN geology_master g ON ST_Intersects(p.geom, g.geom)
             GROUP BY g.unit_name, g.main_litho, g.litho_fmly
             ORDER BY point_count DESC
-            LIMIT 20
+            LIMIT 10
         """
         
         try:
-            results = self.db.execute_query(sql)
+            results = await self._execute_point_query(sql, point_ids)
+            
+            # Window totals are computed before LIMIT, so this is the full unit count
+            geology_units = results[0]["unit_total"] if results else 0
+            for r in results:
+                del r["unit_total"]
+            
+            header = f"🪨 **Geology Correlation**\n{'─' * 40}\n\n**Host rock types:**\n"
+            summary = header + "\n".join(
+                f"  • {r['lithology']} ({r['rock_family']}): **{r['point_count']}** points ({r['percentage']}%)"
+                for r in results
+            )
+            
+            return {
+                "success": True,
+                "analysis_type": "geology_correlation",
+                "results": {
+                    "geology_units": geology_units,
+                    "distribution": results
+                },
+                "data": results,
+                "summary": summary
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    async def _run_density(self, params: Dict) -> Dict[str, Any]:
+        """
+        Run density/hotspot analysis by aggregating points in PostGIS.
+        
+        Points are grouped into grid cells by default; pass method="kmeans"
+        (with optional k) to group them with ST_ClusterKMeans instead.
+        Either way only one row per group comes back.
+        """
+        method = params.get("method", "grid")
+        cell_size_m = float(params.get("cell_size_m", 5000))
+        
+        point_ids = self._point_ids()
+        
+        if not point_ids:
+            return {"success": False, "error": "No valid point IDs found"}
+        
+        table = self._primary_table()
+        
+        if method == "kmeans":
+            # k is inlined (validated int) so the id filter keeps the first bind slot
+            k = max(1, min(int(params.get("k", 8)), len(point_ids)))
+            groups_sql = f"""
+                clustered AS (
+                    SELECT ST_ClusterKMeans(geom, {k}) OVER () AS cid, geom
+                    FROM {table}
+                    WHERE {self._point_filter(point_ids)}
+                ),
+                cells AS (
+                    SELECT ST_Centroid(ST_Collect(geom)) AS centroid, COUNT(*) AS point_count,
+                        COUNT(*) OVER () AS cell_total
+                    FROM clustered
+                    GROUP BY cid
+                )
+            """
+            extra_params = ()
+            parameters = {"method": method, "k": k}
+            method_line = f"K-means clusters: {k}"
+        else:
+            groups_sql = f"""
+                cells AS (
+                    SELECT ST_Centroid(ST_Collect(geom)) AS centroid, COUNT(*) AS point_count,
+                        COUNT(*) OVER () AS cell_total
+                    FROM {table}
+                    WHERE {self._point_filter(point_ids)}
+                    GROUP BY ST_SnapToGrid(geom, %s)
+                    ORDER BY point_count DESC
+                    LIMIT 100
+                )
+            """
+            extra_params = (cell_size_m,)
+            parameters = {"method": "grid", "cell_size_m": cell_size_m}
+            method_line = f"Grid cell size: {cell_size_m / 1000:g} km"
+        
+        sql = f"""
+            WITH {groups_sql}
+            SELECT 
+                point_count,
+                cell_total,
+                ST_Y(ST_Transform(ST_SetSRID(centroid, 3857), 4326)) AS latitude,
+                ST_X(ST_Transform(ST_SetSRID(centroid, 3857), 4326)) AS longitude
+            FROM cells
+            ORDER BY point_count DESC
+        """
+        
+        try:
+            results = await self._execute_point_query(sql, point_ids, extra_params)
+            
+            # Window totals are computed before LIMIT, so this counts every occupied cell
+            cell_count = results[0]["cell_total"] if results else 0
+            for r in results:
+                del r["cell_total"]
             
             lines = [
-                f"🪨 **Geology Correlation**",
+                f"🔥 **Density Analysis**",
                 f"─" * 40,
+                method_line,
                 "",
-                "**Host rock types:**"
+                f"• **{cell_count}** occupied cells",
+                "",
+                "**Hotspots:**"
             ]
-            for r in results[:10]:
-                lines.append(f"  • {r['lithology']} ({r['rock_family']}): **{r['point_count']}** points ({r['percentage']}%)")
+            for r in results[:5]:
+                lines.append(
+                    f"  • {r['point_count']} points near "
+                    f"({float(r['latitude']):.3f}, {float(r['longitude']):.3f})"
+                )
             
             return {
                 "success": True,
-                "analysis_type": "geology_correlation",
+                "analysis_type": "density",
+                "parameters": parameters,
                 "results": {
-                    "geology_units": len(results),
-                    "distribution": results
+                    "cell_count": cell_count,
+                    "cells": results
                 },
                 "data": results,
                 "summary": "\n".join(lines)
@@ -851,16 +1332,6 @@ class SpatialAnalysisAgent:
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    async def _run_density(self, params: Dict) -> Dict[str, Any]:
-        """Run density/hotspot analysis."""
-        # Simplified density using grid cells
-        return {
-            "success": True,
-            "analysis_type": "density",
-            "summary": "🔥 **Density Analysis**\n\nDensity analysis shows point concentration patterns. Use the clustering results to identify hotspots.",
-            "data": self.last_query_data
-        }
-    
     async def _run_nearest_neighbor(self, params: Dict) -> Dict[str, Any]:
         """Calculate nearest neighbor distances."""
         return {
@@ -871,40 +1342,90 @@ class SpatialAnalysisAgent:
         }
     
     async def _run_bounding_area(self, params: Dict) -> Dict[str, Any]:
-        """Calculate convex hull / bounding area."""
-        point_ids = [r.get("gid") for r in self.last_query_data if r.get("gid")]
+        """
+        Calculate bounding area of the points.
         
-        if not point_ids or len(point_ids) < 3:
+        Uses the bounding box (ST_Extent) by default since only the area is
+        shown; pass return_hull=True for the convex hull and its GeoJSON.
+        """
+        if not self.last_query_data or len(self.last_query_data) < 3:
             return {"success": False, "error": "Need at least 3 points"}
         
-        table = self.last_tables_used[0] if self.last_tables_used else "mods"
+        point_ids = self._point_ids()
         
-        sql = f"""
-            SELECT 
-                ROUND((ST_Area(ST_ConvexHull(ST_Collect(
-                    ST_Transform(ST_SetSRID(geom, 3857), 4326)
-                ))::geography) / 1000000)::numeric, 2) as area_km2,
-                ST_AsGeoJSON(ST_ConvexHull(ST_Collect(
-                    ST_Transform(ST_SetSRID(geom, 3857), 4326)
-                ))) as hull_geojson
-            FROM {table}
-            WHERE gid IN ({','.join(map(str, point_ids))})
-        """
+        if len(point_ids) < 3:
+            return {"success": False, "error": "Need at least 3 points"}
+        
+        table = self._primary_table()
+        return_hull = bool(params.get("return_hull")) or not params.get("use_extent", True)
+        
+        if return_hull:
+            shape_sql = "ST_ConvexHull(ST_Collect(geom))"
+        else:
+            shape_sql = "ST_Extent(geom)::geometry"
+        
+        def build_sql(where_sql: str) -> str:
+            # Shape is built once in the native SRID; only that single
+            # geometry is reprojected
+            return f"""
+                WITH area AS (
+                    SELECT {shape_sql} AS shape_3857
+                    FROM {table}
+                    WHERE {where_sql}
+                ),
+                shape AS (
+                    SELECT ST_Transform(ST_SetSRID(shape_3857, 3857), 4326) AS shape_4326
+                    FROM area
+                )
+                SELECT 
+                    ROUND((ST_Area(shape_4326::geography) / 1000000)::numeric, 2) as area_km2,
+                    CASE WHEN ST_NPoints(shape_4326) < {SHAPE_WKB_MIN_VERTICES}
+                        THEN ST_AsGeoJSON(shape_4326) END as shape_geojson,
+                    CASE WHEN ST_NPoints(shape_4326) >= {SHAPE_WKB_MIN_VERTICES}
+                        THEN ST_AsBinary(shape_4326) END as shape_wkb
+                FROM shape
+            """
         
         try:
-            results = self.db.execute_query(sql)
+            results = None
+            
+            # Large sets re-apply the originating query in Postgres rather
+            # than shipping every gid back to it
+            source_filter = None
+            if len(point_ids) > POINT_IDS_COPY_THRESHOLD:
+                source_filter = self._source_filter()
+            if source_filter is not None:
+                try:
+                    results = await self.db.fetch(build_sql(source_filter))
+                except Exception as e:
+                    logger.warning(f"Bounding area: re-applying source query failed, binding IDs: {e}")
+            
+            if results is None:
+                # Interior points never shape the hull or the extent, so large
+                # sets only ship the candidates on or outside the extreme-point octagon
+                hull_ids = point_ids
+                if len(point_ids) > POINT_IDS_COPY_THRESHOLD:
+                    hull_ids = hull_candidate_ids(self.last_query_data) or point_ids
+                    logger.info(f"Bounding area: {len(hull_ids)} of {len(point_ids)} points are hull candidates")
+                results = await self._execute_point_query(build_sql(self._point_filter(hull_ids)), hull_ids)
             
             if results:
                 area = results[0].get("area_km2", 0)
+                shape_geojson = results[0].get("shape_geojson")
+                if results[0].get("shape_wkb") is not None:
+                    shape_geojson = json.dumps(mapping(wkb.loads(bytes(results[0]["shape_wkb"]))))
+                shape_key = "convex_hull" if return_hull else "bounding_box"
+                shape_word = "convex hull" if return_hull else "bounding box"
                 
                 return {
                     "success": True,
                     "analysis_type": "bounding_area",
                     "results": {
                         "area_km2": area,
-                        "convex_hull": results[0].get("hull_geojson")
+                        "method": shape_key,
+                        shape_key: shape_geojson
                     },
-                    "summary": f"📐 **Bounding Area**\n─{'─'*40}\n\nThe {len(point_ids)} points span an area of **{area} km²**"
+                    "summary": f"📐 **Bounding Area**\n─{'─'*40}\n\nThe {len(point_ids)} points span an area of **{area} km²** ({shape_word})"
                 }
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -915,24 +1436,17 @@ class SpatialAnalysisAgent:
     
     async def _run_total_length(self, params: Dict) -> Dict[str, Any]:
         """Calculate total length of line features."""
-        sql = """
-            SELECT 
-                ROUND((SUM(ST_Length(
-                    ST_Transform(ST_SetSRID(geom, 3857), 4326)::geography
-                )) / 1000)::numeric, 2) as total_length_km,
-                COUNT(*) as line_count
-            FROM geology_faults_contacts_master
-        """
-        
         try:
-            results = self.db.execute_query(sql)
-            if results:
+            results = await self._cached_statement("total_length")
+            # The aggregate always returns one row; no lines means count 0
+            if results and results[0].get("line_count"):
                 return {
                     "success": True,
                     "analysis_type": "total_length",
                     "results": results[0],
                     "summary": f"📏 **Total Length**\n\n{results[0]['line_count']} lines totaling **{results[0]['total_length_km']} km**"
                 }
+            return {"success": False, "error": "No line features found"}
         except Exception as e:
             return {"success": False, "error": str(e)}
     
@@ -982,36 +1496,25 @@ class SpatialAnalysisAgent:
     
     async def _run_litho_distribution(self, params: Dict) -> Dict[str, Any]:
         """Analyze lithology distribution."""
-        sql = """
-            SELECT 
-                COALESCE(litho_fmly, 'Unknown') as rock_family,
-                COUNT(*) as unit_count,
-                ROUND((SUM(ST_Area(
-                    ST_Transform(ST_SetSRID(geom, 3857), 4326)::geography
-                )) / 1000000)::numeric, 0) as total_area_km2
-            FROM geology_master
-            GROUP BY litho_fmly
-            ORDER BY total_area_km2 DESC
-            LIMIT 15
-        """
-        
         try:
-            results = self.db.execute_query(sql)
+            try:
+                results = await self._cached_statement("litho_distribution")
+            except Exception as e:
+                logger.warning(f"Lithology view unavailable, aggregating live: {e}")
+                results = await self._cached_statement("litho_distribution_live")
             
-            lines = [
-                f"🗺️ **Lithology Distribution**",
-                f"─" * 40,
-                ""
-            ]
-            for r in results:
-                lines.append(f"  • {r['rock_family']}: {r['unit_count']} units, {r['total_area_km2']} km²")
+            header = f"🗺️ **Lithology Distribution**\n{'─' * 40}\n\n"
+            summary = header + "\n".join(
+                f"  • {r['rock_family']}: {r['unit_count']} units, {r['total_area_km2']} km²"
+                for r in results
+            )
             
             return {
                 "success": True,
                 "analysis_type": "litho_distribution",
                 "results": results,
                 "data": results,
-                "summary": "\n".join(lines)
+                "summary": summary
             }
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -1022,6 +1525,10 @@ class SpatialAnalysisAgent:
         self.last_query_data = None
         self.last_query_type = None
         self.last_tables_used = []
+        self.last_sql = None
+        self._last_sql_data = None
+        self._cluster_points = None
+        self._radius_graph = None
 
 
 # =============================================================================
@@ -1029,11 +1536,14 @@ class SpatialAnalysisAgent:
 # =============================================================================
 
 _spatial_analysis_agent: Optional[SpatialAnalysisAgent] = None
+_spatial_analysis_agent_lock = threading.Lock()
 
 
 def get_spatial_analysis_agent() -> SpatialAnalysisAgent:
     """Get or create the global spatial analysis agent."""
     global _spatial_analysis_agent
     if _spatial_analysis_agent is None:
-        _spatial_analysis_agent = SpatialAnalysisAgent()
+        with _spatial_analysis_agent_lock:
+            if _spatial_analysis_agent is None:
+                _spatial_analysis_agent = SpatialAnalysisAgent()
     return _spatial_analysis_agent
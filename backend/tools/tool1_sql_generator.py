@@ -13,12 +13,30 @@ Key Improvements:
 =============================================================================
 """
 
+import copy
+import functools
 import logging
 import re
-from typing import Dict, Any, Optional, Tuple, List
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Tuple, List, NamedTuple, Mapping, Sequence
 
+import numpy as np
+
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+from config import settings
 from llm.ollama_client import get_ollama_client
 from database.postgis_client import get_postgis_client
+from rag.embedding_service import get_embedding_service
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +50,189 @@ SAUDI_REGIONS = {
     "jazan": "Jazan Region", "najran": "Najran Region", "qassim": "Qassim Region"
 }
 
+# Single-pass scanners for _preprocess_query
+_RE_CITY = re.compile(r'\b(' + '|'.join(map(re.escape, SAUDI_REGIONS)) + r')\b')
+_RE_COMMODITY_WORD = re.compile('gold|copper|silver|zinc|iron|lead|nickel')
+_RE_MINE_WORD = re.compile('mines|deposits|sites|occurrences')
+
+# Generated SQL is cached per normalized query (LRU)
+SQL_RESULT_CACHE_SIZE = 1024
+
+_RE_NUMBER = re.compile(r'\d+')
+# Time-relative or random requests can't reuse an earlier answer
+_RE_UNCACHEABLE = re.compile(r'\b(today|now|yesterday|tomorrow|random|randomly)\b')
+
+# =============================================================================
+# SQL POST-PROCESSOR PATTERNS (compiled once at import)
+# =============================================================================
+
+# Explicit column lists for SELECT *
+_SELECT_STAR_COLUMNS = {
+    'geology_faults_contacts_master': 'gid, newtype, shape_leng, ST_AsGeoJSON(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS geojson_geom',
+    'geology_master': 'gid, unit_name, main_litho, litho_fmly, terrane, ST_AsGeoJSON(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS geojson_geom',
+    'mods': 'gid, eng_name, major_comm, minor_comm, region, occ_imp, ST_Y(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS latitude, ST_X(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS longitude',
+    'borholes': 'gid, project_na, borehole_i, elements, ST_Y(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS latitude, ST_X(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS longitude',
+    'surface_samples': 'gid, sampleid, sampletype, elements, ST_Y(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS latitude, ST_X(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS longitude'
+}
+# SELECT * FROM <known table>, capturing the table for a dict lookup
+_RE_SELECT_STAR = re.compile(
+    r'SELECT\s+\*\s+FROM\s+(' + '|'.join(_SELECT_STAR_COLUMNS) + r')\b',
+    re.IGNORECASE
+)
+# The unqualified column lists are ambiguous when the FROM clause joins
+# another table, so SELECT * is left alone there
+_RE_FROM_CLAUSE_END = re.compile(r'\b(where|group|order|limit|having|union)\b|[;)]', re.IGNORECASE)
+_RE_FROM_CLAUSE_JOIN = re.compile(r'\bjoin\b|,', re.IGNORECASE)
+
+# Invented table names → real tables
+_TABLE_NAME_FIXES = {
+    'deposits': 'mods', 'mines': 'mods', 'sites': 'mods',
+    'faults': 'geology_faults_contacts_master',
+    'areas': 'geology_master', 'zones': 'geology_master'
+}
+_TABLE_FIXES = [
+    # Compound names → mods
+    (re.compile(r'(FROM|JOIN)\s+\w+_deposits\b', re.IGNORECASE), r'\1 mods'),
+    (re.compile(r'(FROM|JOIN)\s+\w+_mines\b', re.IGNORECASE), r'\1 mods'),
+    (re.compile(r'(FROM|JOIN)\s+\w+_sites\b', re.IGNORECASE), r'\1 mods'),
+] + [
+    # Simple wrong names
+    (re.compile(rf'(FROM|JOIN)\s+{wrong}\b', re.IGNORECASE), rf'\1 {correct}')
+    for wrong, correct in _TABLE_NAME_FIXES.items()
+]
+
+# Invented column names → real columns
+_COLUMN_NAME_FIXES = {
+    'deposit_id': 'gid', 'mine_id': 'gid', 'site_id': 'gid',
+    'area_id': 'gid', 'fault_id': 'gid',
+    'deposit_name': 'eng_name', 'mine_name': 'eng_name', 'site_name': 'eng_name',
+    'area_name': 'unit_name', 'fault_name': 'newtype', 'fault_type': 'newtype',
+    'commodity': 'major_comm', 'importance': 'occ_imp',
+    'rock_type': 'main_litho', 'lithology': 'main_litho',
+}
+_RE_COLUMN_FIX = re.compile(r'\b(' + '|'.join(_COLUMN_NAME_FIXES) + r')\b', re.IGNORECASE)
+_RE_ID_WORD = re.compile(r'\bid\b', re.IGNORECASE)
+_RE_ALIAS_ID = re.compile(r'(\w+)\.id\b(?!\w)', re.IGNORECASE)
+_RE_SELECT_ID = re.compile(r'\bSELECT\s+id\s*,', re.IGNORECASE)
+_RE_TRAILING_ID = re.compile(r',\s*id\s+FROM', re.IGNORECASE)
+
+# Spatial predicates whose two geometry arguments must both carry SRID 3857
+_SPATIAL_OPS = {
+    op.lower(): op
+    for op in ['ST_Intersects', 'ST_DWithin', 'ST_Within', 'ST_Contains', 'ST_Crosses']
+}
+# One pass over all ops: op(arg1, arg2 where each arg is a bare (alias.)geom
+# or an existing ST_SetSRID(...) call
+_SPATIAL_GEOM_ARG = r'(ST_SetSRID\s*\([^)]+\)|(?:\w+\.)?geom\b)'
+_RE_SPATIAL_OP = re.compile(
+    rf'({"|".join(_SPATIAL_OPS.values())})\s*\(\s*{_SPATIAL_GEOM_ARG}\s*,\s*{_SPATIAL_GEOM_ARG}',
+    re.IGNORECASE
+)
+
+# Polygon/line tables that need geojson_geom: (table, geom_type, FROM pattern, alias pattern)
+_GEOJSON_TABLES = [
+    (
+        table,
+        geom_type,
+        re.compile(rf'\bFROM\s+{table}\b', re.IGNORECASE),
+        re.compile(rf'FROM\s+{table}\s+(\w+)', re.IGNORECASE),
+    )
+    for table, geom_type in [
+        ('geology_master', 'polygon'),
+        ('geology_faults_contacts_master', 'line')
+    ]
+]
+# Every "from <table>" / "join <table>" reference in lowercased SQL, in one
+# scan, as (keyword, table) pairs
+_POINT_TABLES = ('mods', 'borholes', 'surface_samples')
+_RE_TABLE_REF = re.compile(
+    r'(from|join) (' + '|'.join([*_POINT_TABLES, *(t[0] for t in _GEOJSON_TABLES)]) + ')'
+)
+_RE_LATITUDE_COL = re.compile(r',?\s*ST_Y\s*\([^)]+\)\s*AS\s+latitude', re.IGNORECASE)
+_RE_LONGITUDE_COL = re.compile(r',?\s*ST_X\s*\([^)]+\)\s*AS\s+longitude', re.IGNORECASE)
+_RE_DOUBLE_COMMA = re.compile(r',\s*,')
+_RE_SELECT_COMMA = re.compile(r'SELECT\s*,', re.IGNORECASE)
+
+# Per-row reprojection to WGS84; replaced by the stored geom_4326 column
+# (scripts/optimize_database.py) when settings.use_geom_4326 is enabled
+_RE_TRANSFORM_4326 = re.compile(
+    r'ST_Transform\s*\(\s*ST_SetSRID\s*\(\s*(\w+\.)?geom\s*,\s*3857\s*\)\s*,\s*4326\s*\)',
+    re.IGNORECASE
+)
+
+_RE_BOREHOLES = re.compile(r'\bboreholes\b', re.IGNORECASE)
+_RE_COMMODITY_AND = re.compile(
+    r"major_comm\s+ILIKE\s+('[^']+')\s+AND\s+minor_comm\s+ILIKE\s+\1",
+    re.IGNORECASE
+)
+_RE_FIRST_SELECT = re.compile(r'\bSELECT\b', re.IGNORECASE)
+
+# Lowercase substrings at least one fixer needs before it can change the SQL;
+# SQL containing none of them (and no bare "id") is returned untouched
+_FIX_SENTINELS = (
+    ('*', 'geology_', 'boreholes', ' join ')
+    + tuple(_TABLE_NAME_FIXES)
+    + tuple(_COLUMN_NAME_FIXES)
+    + tuple(_SPATIAL_OPS)
+)
+
+
+def _collapse_whitespace(text: str) -> str:
+    """Trim and collapse whitespace runs to single spaces (str.split runs in C)."""
+    return ' '.join(text.split())
+
+
+def _build_sentinel_database():
+    """Compile the fix sentinels into one Hyperscan database (None if unavailable)."""
+    if not HYPERSCAN_AVAILABLE:
+        return None
+    # "minor_comm" alone over-approximates the AND probe, which is safe here
+    expressions = [re.escape(token).encode() for token in _FIX_SENTINELS]
+    expressions += [rb'\bid\b', rb'minor_comm']
+    flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH
+    database = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+    try:
+        database.compile(
+            expressions=expressions,
+            ids=list(range(len(expressions))),
+            elements=len(expressions),
+            flags=[flags] * len(expressions),
+        )
+    except hyperscan.error as e:
+        logger.warning(f"Hyperscan sentinel database unavailable, using substring scan: {e}")
+        return None
+    return database
+
+
+_SENTINEL_DATABASE = _build_sentinel_database()
+
+
+def _needs_fixing(ctx: "SqlText") -> bool:
+    """True if the SQL contains anything at least one fixer acts on."""
+    sql, sql_lower = ctx
+    if _SENTINEL_DATABASE is not None:
+        # The handler stops the scan at the first sentinel, which
+        # python-hyperscan reports by raising ScanTerminated
+        try:
+            _SENTINEL_DATABASE.scan(sql.encode(), match_event_handler=lambda *args: True)
+        except hyperscan.ScanTerminated:
+            return True
+        return False
+    return (
+        any(token in sql_lower for token in _FIX_SENTINELS)
+        or ('minor_comm' in sql_lower and 'and' in sql_lower)
+        or _RE_ID_WORD.search(sql) is not None
+    )
+
+
+_RE_GEOJSON_FROM_FAULTS = re.compile(r'st_asgeojson\s*\([^)]*f\.geom')
+_RE_GEOJSON_FROM_GEOLOGY = re.compile(r'st_asgeojson\s*\([^)]*g\.geom')
+
+# Limit extraction: "<keyword> N", "give me N", "limit to N", "N <keyword>"
+_RE_WORD = re.compile(r'\w+')
+_LIMIT_BEFORE_WORDS = frozenset({'top', 'first', 'show', 'get', 'nearest', 'limit'})
+_LIMIT_AFTER_WORDS = frozenset({'nearest', 'closest', 'top', 'first'})
+
 # =============================================================================
 # IMPROVED SYSTEM PROMPT
 # =============================================================================
@@ -254,6 +455,133 @@ LINE table (geology_faults_contacts_master):
 "faults", "fault lines", "contacts" → geology_faults_contacts_master (LINE)
 """
 
+# Template split around its only placeholder (with {{ }} escapes resolved),
+# so rendering is a plain concatenation instead of str.format
+_PROMPT_PREFIX, _PROMPT_SUFFIX = (
+    part.replace('{{', '{').replace('}}', '}')
+    for part in SYSTEM_PROMPT_TEMPLATE.split('{dynamic_schema}', 1)
+)
+
+
+# =============================================================================
+# SAMPLE VALUE COLUMNS
+# =============================================================================
+
+# Sample values shown per column in the system prompt
+PROMPT_SAMPLE_SIZE = 6
+# Distinct values kept per column for the reverse mapping
+REVERSE_MAPPING_SAMPLE_SIZE = 100
+
+# Columns whose sample values appear in the system prompt (loaded at startup,
+# capped at PROMPT_SAMPLE_SIZE)
+_PROMPT_COLUMNS = MappingProxyType({
+    'mods': ('major_comm', 'region', 'occ_imp'),
+    'geology_master': ('litho_fmly', 'main_litho', 'terrane'),
+    'geology_faults_contacts_master': ('newtype',)
+})
+
+# Columns only needed for the reverse value mapping (loaded on first use)
+_REVERSE_ONLY_COLUMNS = MappingProxyType({
+    'mods': ('minor_comm', 'occ_type', 'occ_status', 'structural', 'host_rocks',
+             'alteration', 'min_morpho', 'trace_comm'),
+    'geology_master': ('family_dv', 'era', 'eon', 'period', 'epoch', 'unit_name'),
+    'borholes': ('borehole_t', 'elements', 'project_na'),
+    'surface_samples': ('sampletype', 'elements')
+})
+
+# Full column set for the reverse mapping; prompt columns are reloaded
+# uncapped in the same per-table scan
+_REVERSE_MAPPING_COLUMNS = MappingProxyType({
+    table: _PROMPT_COLUMNS.get(table, ()) + _REVERSE_ONLY_COLUMNS.get(table, ())
+    for table in {**_PROMPT_COLUMNS, **_REVERSE_ONLY_COLUMNS}
+})
+
+# Reverse-mapping priority per column when a value matches several columns
+# (unlisted columns get DEFAULT_VALUE_PRIORITY)
+_PRIORITY_MAP = MappingProxyType({
+    'region': 100, 'occ_imp': 90, 'occ_type': 90, 'era': 80,
+    'terrane': 75, 'litho_fmly': 70, 'major_comm': 60, 'minor_comm': 55,
+    'main_litho': 50, 'family_dv': 50, 'newtype': 50
+})
+DEFAULT_VALUE_PRIORITY = 20
+
+
+class ValueEntry(NamedTuple):
+    """Where a known column value occurs (reverse-mapping entry)."""
+    priority: int
+    table: str
+    column: str
+    original_value: str
+
+
+class SqlText(NamedTuple):
+    """Generated SQL together with its lowercased form (computed once per version)."""
+    raw: str
+    lower: str
+    
+    @classmethod
+    def of(cls, sql: str) -> "SqlText":
+        return cls(sql, sql.lower())
+    
+    def with_sql(self, sql: str) -> "SqlText":
+        """This SqlText if `sql` is unchanged, else a new one (re-lowercased)."""
+        return self if sql == self.raw else SqlText.of(sql)
+
+
+class SemanticQueryIndex:
+    """
+    Query embeddings for near-duplicate result-cache lookups.
+    
+    Vectors are unit-normalized rows of one matrix, so a lookup is a single
+    matrix-vector product. A match must also share the query's entity
+    signature (numbers, regions, commodities): embeddings of "gold in
+    riyadh" and "gold in makkah" are close, but their SQL is not.
+    """
+    
+    def __init__(self, max_size: int = SQL_RESULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._keys: List[str] = []
+        self._signatures: List[frozenset] = []
+        self._vectors: Optional[np.ndarray] = None
+    
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> Optional[np.ndarray]:
+        row = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(row)
+        return row / norm if norm else None
+    
+    def add(self, key: str, signature: frozenset, vector: Sequence[float]):
+        """Index a cached query (oldest entries are dropped past max_size)."""
+        row = self._unit(vector)
+        if row is None or key in self._keys:
+            return
+        if self._vectors is not None and self._vectors.shape[1] != row.shape[0]:
+            self.clear()  # Embedding model changed
+        self._vectors = row[None, :] if self._vectors is None else np.vstack([self._vectors, row])
+        self._keys.append(key)
+        self._signatures.append(signature)
+        if len(self._keys) > self.max_size:
+            self._vectors = self._vectors[1:]
+            del self._keys[0], self._signatures[0]
+    
+    def best_match(self, signature: frozenset, vector: Sequence[float], threshold: float) -> Optional[str]:
+        """Key of the most similar indexed query with the same signature, if above threshold."""
+        row = self._unit(vector)
+        if row is None or self._vectors is None or self._vectors.shape[1] != row.shape[0]:
+            return None
+        scores = self._vectors @ row
+        for index in np.argsort(scores)[::-1]:
+            if scores[index] < threshold:
+                break
+            if self._signatures[index] == signature:
+                return self._keys[index]
+        return None
+    
+    def clear(self):
+        self._keys.clear()
+        self._signatures.clear()
+        self._vectors = None
+
 
 class SQLGenerator:
     """SQL Generator with improved prompt and post-processor."""
@@ -262,86 +590,131 @@ class SQLGenerator:
         self.ollama = get_ollama_client()
         self.db = get_postgis_client()
         self._column_values: Dict[str, Dict[str, List[str]]] = {}
-        self._reverse_mapping: Dict[str, Dict[str, Any]] = {}
-        self._load_column_values()
-        self._build_reverse_mapping()
+        self._result_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._semantic_index = SemanticQueryIndex()
+        self._load_column_values(_PROMPT_COLUMNS, limit=PROMPT_SAMPLE_SIZE)
+        # Sample values only change on refresh, so the prompt is built once
+        self._system_prompt = self._build_system_prompt()
     
     # =========================================================================
-    # COLUMN VALUE LOADING (unchanged from original)
+    # COLUMN VALUE LOADING
     # =========================================================================
     
-    def _load_column_values(self):
-        """Load distinct values from key columns in database."""
+    def _load_column_values(self, tables_columns: Mapping[str, Sequence[str]],
+                            limit: int = REVERSE_MAPPING_SAMPLE_SIZE):
+        """Load up to `limit` distinct values per column, merging into _column_values."""
         logger.info("Loading column values from database...")
         
-        tables_columns = {
-            'mods': ['major_comm', 'minor_comm', 'region', 'occ_imp', 'occ_type', 
-                     'occ_status', 'structural', 'host_rocks', 'alteration', 
-                     'min_morpho', 'trace_comm'],
-            'geology_master': ['litho_fmly', 'main_litho', 'family_dv', 'terrane', 
-                               'era', 'eon', 'period', 'epoch', 'unit_name'],
-            'geology_faults_contacts_master': ['newtype'],
-            'borholes': ['borehole_t', 'elements', 'project_na'],
-            'surface_samples': ['sampletype', 'elements']
-        }
-        
-        self._column_values = {}
-        
-        for table, columns in tables_columns.items():
-            self._column_values[table] = {}
-            for column in columns:
-                try:
-                    query = f'SELECT DISTINCT "{column}" FROM {table} WHERE "{column}" IS NOT NULL AND "{column}" != \'\' LIMIT 100'
-                    results = self.db.execute_query(query)
-                    values = []
-                    for row in results:
-                        if isinstance(row, dict):
-                            val = row.get(column) or row.get(column.lower())
-                        else:
-                            val = row[0] if len(row) > 0 else None
-                        if val and str(val).strip():
-                            values.append(str(val).strip())
-                    self._column_values[table][column] = values
-                except Exception as e:
-                    logger.warning(f"Failed to load values for {table}.{column}: {e}")
-                    self._column_values[table][column] = []
+        # Tables are independent, so probe them concurrently on pooled connections
+        with ThreadPoolExecutor(max_workers=len(tables_columns)) as executor:
+            loaded = executor.map(
+                lambda item: (item[0], self._load_table_with_fallback(*item, limit)),
+                tables_columns.items()
+            )
+            for table, values in loaded:
+                self._column_values.setdefault(table, {}).update(values)
         
         logger.info(f"Loaded column values for {len(self._column_values)} tables")
     
-    def _build_reverse_mapping(self):
-        """Build reverse mapping: value → (table, column, original_value, priority)."""
-        logger.info("Building reverse value mapping...")
+    def _load_table_with_fallback(self, table: str, columns: Sequence[str], limit: int) -> Dict[str, List[str]]:
+        """Batched load for one table, probing columns one by one if it fails."""
+        try:
+            return self._load_table_values(table, columns, limit)
+        except Exception as e:
+            logger.warning(f"Batched value load failed for {table}, probing columns one by one: {e}")
+            return {column: self._load_single_column(table, column, limit) for column in columns}
+    
+    def _load_table_values(self, table: str, columns: Sequence[str],
+                           limit: int = REVERSE_MAPPING_SAMPLE_SIZE) -> Dict[str, List[str]]:
+        """
+        Load up to `limit` distinct values for each column with a single
+        table scan, unpivoting the columns into (column_name, value) pairs.
+        """
+        pairs = ", ".join(f"('{column}', \"{column}\"::text)" for column in columns)
+        query = f"""
+            SELECT column_name, value
+            FROM (
+                SELECT column_name, value,
+                       row_number() OVER (PARTITION BY column_name) AS rn
+                FROM (
+                    SELECT DISTINCT v.column_name, v.value
+                    FROM {table}
+                    CROSS JOIN LATERAL (VALUES {pairs}) AS v(column_name, value)
+                    WHERE v.value IS NOT NULL AND v.value != ''
+                ) distinct_values
+            ) ranked
+            WHERE rn <= {limit}
+        """
         
-        priority_map = {
-            'region': 100, 'occ_imp': 90, 'occ_type': 90, 'era': 80,
-            'terrane': 75, 'litho_fmly': 70, 'major_comm': 60, 'minor_comm': 55,
-            'main_litho': 50, 'family_dv': 50, 'newtype': 50
-        }
+        values = {column: [] for column in columns}
+        for row in self.db.execute_query(query):
+            if (text := str(row['value']).strip()):
+                values[row['column_name']].append(text)
+        return values
+    
+    def _load_single_column(self, table: str, column: str,
+                            limit: int = REVERSE_MAPPING_SAMPLE_SIZE) -> List[str]:
+        """Load distinct values for one column (fallback for _load_table_values)."""
+        try:
+            query = f'SELECT DISTINCT "{column}" FROM {table} WHERE "{column}" IS NOT NULL AND "{column}" != \'\' LIMIT {limit}'
+            results = self.db.execute_query(query)
+            if not results:
+                return []
+            
+            # Row type is fixed per client, so pick the extractor once
+            if isinstance(results[0], dict):
+                column_lower = column.lower()
+                extract = lambda row: row.get(column) or row.get(column_lower)
+            else:
+                extract = lambda row: row[0] if len(row) > 0 else None
+            
+            return [
+                text for row in results
+                if (val := extract(row)) and (text := str(val).strip())
+            ]
+        except Exception as e:
+            logger.warning(f"Failed to load values for {table}.{column}: {e}")
+            return []
+    
+    @functools.cached_property
+    def _reverse_mapping(self) -> Dict[str, List[ValueEntry]]:
+        """Reverse value mapping, built on first use (loads the full column set)."""
+        self._load_column_values(_REVERSE_MAPPING_COLUMNS)
+        return self._build_reverse_mapping()
+    
+    def _build_reverse_mapping(self) -> Dict[str, List[ValueEntry]]:
+        """Build reverse mapping: value → [ValueEntry(priority, table, column, original_value)]."""
+        logger.info("Building reverse value mapping...")
         
-        self._reverse_mapping = {}
+        reverse_mapping: Dict[str, List[ValueEntry]] = {}
         
+        # Interned so the few table/column names and values repeated across
+        # columns (e.g. major_comm/minor_comm) share one string object
         for table, columns in self._column_values.items():
+            table = sys.intern(table)
             for column, values in columns.items():
-                priority = priority_map.get(column, 20)
+                column = sys.intern(column)
+                priority = _PRIORITY_MAP.get(column, DEFAULT_VALUE_PRIORITY)
                 
                 for value in values:
                     if not value or len(str(value).strip()) == 0:
                         continue
                     
-                    value_str = str(value).strip()
-                    value_lower = value_str.lower()
+                    value_str = sys.intern(str(value).strip())
+                    value_lower = sys.intern(value_str.lower())
                     
-                    if value_lower not in self._reverse_mapping:
-                        self._reverse_mapping[value_lower] = []
-                    self._reverse_mapping[value_lower].append({
-                        'table': table, 'column': column,
-                        'original_value': value_str, 'priority': priority
-                    })
-        
-        for value_key in self._reverse_mapping:
-            self._reverse_mapping[value_key].sort(key=lambda x: x['priority'], reverse=True)
-        
-        logger.info(f"Built reverse mapping with {len(self._reverse_mapping)} unique values")
+                    if value_lower not in reverse_mapping:
+                        reverse_mapping[value_lower] = []
+                    reverse_mapping[value_lower].append(
+                        ValueEntry(priority, table, column, value_str)
+                    )
+        
+        by_priority = attrgetter('priority')
+        for entries in reverse_mapping.values():
+            entries.sort(key=by_priority, reverse=True)
+        
+        logger.info(f"Built reverse mapping with {len(reverse_mapping)} unique values")
+        return reverse_mapping
     
     # =========================================================================
     # PREPROCESSING
@@ -352,14 +725,16 @@ class SQLGenerator:
         query_lower = query.lower()
         hints = []
         
-        # Region normalization
-        for city, region in SAUDI_REGIONS.items():
-            if city in query_lower and 'region' not in query_lower:
-                hints.append(f"REGION: {city} → {region}")
+        # Region normalization (hints keep SAUDI_REGIONS order)
+        if 'region' not in query_lower:
+            found = {m.group(1) for m in _RE_CITY.finditer(query_lower)}
+            for city, region in SAUDI_REGIONS.items():
+                if city in found:
+                    hints.append(f"REGION: {city} → {region}")
         
         # Semantic hints
-        has_commodity = any(c in query_lower for c in ['gold', 'copper', 'silver', 'zinc', 'iron', 'lead', 'nickel'])
-        has_mine_word = any(w in query_lower for w in ['mines', 'deposits', 'sites', 'occurrences'])
+        has_commodity = _RE_COMMODITY_WORD.search(query_lower) is not None
+        has_mine_word = _RE_MINE_WORD.search(query_lower) is not None
         
         if has_mine_word and not has_commodity:
             hints.append("SEMANTIC: 'mines/deposits' without commodity → NO commodity filter")
@@ -372,197 +747,175 @@ class SQLGenerator:
         """Build concise schema section with sample values."""
         lines = ["SAMPLE VALUES FROM DATABASE:\n"]
         
-        important_cols = {
-            'mods': ['major_comm', 'region', 'occ_imp'],
-            'geology_master': ['litho_fmly', 'main_litho', 'terrane'],
-            'geology_faults_contacts_master': ['newtype']
-        }
-        
-        for table, columns in important_cols.items():
+        for table, columns in _PROMPT_COLUMNS.items():
             if table not in self._column_values:
                 continue
             lines.append(f"{table}:")
             for col in columns:
-                vals = self._column_values.get(table, {}).get(col, [])[:6]
+                vals = self._column_values.get(table, {}).get(col, [])[:PROMPT_SAMPLE_SIZE]
                 if vals:
                     lines.append(f"  {col}: {', '.join(vals)}")
             lines.append("")
         
         return "\n".join(lines)
     
+    def _build_system_prompt(self) -> str:
+        """Render the system prompt with the current sample values."""
+        prompt = f"{_PROMPT_PREFIX}{self._build_dynamic_schema_prompt()}{_PROMPT_SUFFIX}"
+        # Teach the LLM the stored column directly when it exists
+        return self._use_stored_4326(prompt)
+    
     # =========================================================================
     # SQL POST-PROCESSOR (SAFETY NET)
     # =========================================================================
     
-    def _fix_sql(self, sql: str) -> str:
-        """Fix common LLM mistakes in generated SQL."""
-        original_sql = sql
+    def _fix_sql(self, sql: str) -> SqlText:
+        """
+        Fix common LLM mistakes in generated SQL.
+        
+        Returns the fixed SQL with its lowercased form; fixers share it and
+        it is only recomputed when a fixer actually changes the SQL.
+        """
+        ctx = SqlText.of(sql)
+        
+        # Fast path: most generated SQL already follows the rules
+        if not _needs_fixing(ctx):
+            return ctx.with_sql(self._use_stored_4326(sql))
         
         # 1. Fix SELECT * statements
-        sql = self._fix_select_star(sql)
+        ctx = ctx.with_sql(self._fix_select_star(ctx))
         
         # 2. Fix table names
-        sql = self._fix_table_names(sql)
+        ctx = ctx.with_sql(self._fix_table_names(ctx))
         
         # 3. Fix column names
-        sql = self._fix_column_names(sql)
+        ctx = ctx.with_sql(self._fix_column_names(ctx))
         
         # 4. Fix spatial operations (ensure both geoms have ST_SetSRID)
-        sql = self._fix_spatial_operations(sql)
+        ctx = ctx.with_sql(self._fix_spatial_operations(ctx))
         
         # 5. Ensure geojson_geom for polygon/line tables
-        sql = self._ensure_geojson_geom(sql)
+        ctx = ctx.with_sql(self._ensure_geojson_geom(ctx))
         
         # 6. Fix borholes spelling
-        sql = re.sub(r'\bboreholes\b', 'borholes', sql, flags=re.IGNORECASE)
+        if 'boreholes' in ctx.lower:
+            ctx = ctx.with_sql(_RE_BOREHOLES.sub('borholes', ctx.raw))
         
         # 7. Fix AND → OR for commodity search
-        sql = self._fix_commodity_logic(sql)
-        if ' JOIN ' in sql.upper() and 'DISTINCT' not in sql.upper():
-            sql = re.sub(r'\bSELECT\b', 'SELECT DISTINCT', sql, count=1, flags=re.IGNORECASE)
+        ctx = ctx.with_sql(self._fix_commodity_logic(ctx))
+        if ' join ' in ctx.lower and 'distinct' not in ctx.lower:
+            ctx = ctx.with_sql(_RE_FIRST_SELECT.sub('SELECT DISTINCT', ctx.raw, count=1))
             logger.info("Added DISTINCT to JOIN query")
         
-        if sql != original_sql:
-            logger.info(f"SQL fixed: {original_sql} → {sql}")
+        if ctx.raw != sql:
+            logger.info(f"SQL fixed: {sql} → {ctx.raw}")
         
-        return sql
+        return ctx.with_sql(self._use_stored_4326(ctx.raw))
+    
+    def _use_stored_4326(self, sql: str) -> str:
+        """Replace ST_Transform(ST_SetSRID(geom, 3857), 4326) with the stored geom_4326 column."""
+        if not settings.use_geom_4326 or '4326' not in sql:
+            return sql
+        return _RE_TRANSFORM_4326.sub(r'\1geom_4326', sql)
     
-    def _fix_select_star(self, sql: str) -> str:
+    def _fix_select_star(self, ctx: SqlText) -> str:
         """Replace SELECT * with proper column lists."""
-        if not re.search(r'SELECT\s+\*\s+FROM', sql, re.IGNORECASE):
+        sql = ctx.raw
+        if '*' not in sql:
             return sql
         
-        sql_lower = sql.lower()
-        
-        replacements = {
-            'geology_faults_contacts_master': 'gid, newtype, shape_leng, ST_AsGeoJSON(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS geojson_geom',
-            'geology_master': 'gid, unit_name, main_litho, litho_fmly, terrane, ST_AsGeoJSON(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS geojson_geom',
-            'mods': 'gid, eng_name, major_comm, minor_comm, region, occ_imp, ST_Y(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS latitude, ST_X(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS longitude',
-            'borholes': 'gid, project_na, borehole_i, elements, ST_Y(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS latitude, ST_X(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS longitude',
-            'surface_samples': 'gid, sampleid, sampletype, elements, ST_Y(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS latitude, ST_X(ST_Transform(ST_SetSRID(geom, 3857), 4326)) AS longitude'
-        }
-        
-        for table, columns in replacements.items():
-            if table in sql_lower:
-                pattern = rf'SELECT\s+\*\s+FROM\s+{table}'
-                sql = re.sub(pattern, f'SELECT {columns} FROM {table}', sql, flags=re.IGNORECASE)
-                logger.warning(f"Fixed SELECT * for {table}")
-                break
+        def replace_star(m):
+            clause_end = _RE_FROM_CLAUSE_END.search(sql, m.end())
+            from_clause = sql[m.end():clause_end.start() if clause_end else len(sql)]
+            if _RE_FROM_CLAUSE_JOIN.search(from_clause):
+                return m.group(0)
+            table = m.group(1).lower()
+            logger.warning(f"Fixed SELECT * for {table}")
+            return f'SELECT {_SELECT_STAR_COLUMNS[table]} FROM {table}'
         
-        return sql
+        return _RE_SELECT_STAR.sub(replace_star, sql)
     
-    def _fix_table_names(self, sql: str) -> str:
+    def _fix_table_names(self, ctx: SqlText) -> str:
         """Fix invented/wrong table names."""
-        # Compound names → mods
-        sql = re.sub(r'(FROM|JOIN)\s+\w+_deposits\b', r'\1 mods', sql, flags=re.IGNORECASE)
-        sql = re.sub(r'(FROM|JOIN)\s+\w+_mines\b', r'\1 mods', sql, flags=re.IGNORECASE)
-        sql = re.sub(r'(FROM|JOIN)\s+\w+_sites\b', r'\1 mods', sql, flags=re.IGNORECASE)
-        
-        # Simple wrong names
-        simple_fixes = {
-            'deposits': 'mods', 'mines': 'mods', 'sites': 'mods',
-            'faults': 'geology_faults_contacts_master',
-            'areas': 'geology_master', 'zones': 'geology_master'
-        }
+        sql, sql_lower = ctx
+        if not any(name in sql_lower for name in _TABLE_NAME_FIXES):
+            return sql
         
-        for wrong, correct in simple_fixes.items():
-            sql = re.sub(rf'(FROM|JOIN)\s+{wrong}\b', rf'\1 {correct}', sql, flags=re.IGNORECASE)
+        for pattern, correct in _TABLE_FIXES:
+            sql = pattern.sub(correct, sql)
         
         return sql
     
-    def _fix_column_names(self, sql: str) -> str:
+    def _fix_column_names(self, ctx: SqlText) -> str:
         """Fix invented column names."""
-        column_fixes = {
-            r'\bdeposit_id\b': 'gid', r'\bmine_id\b': 'gid', r'\bsite_id\b': 'gid',
-            r'\barea_id\b': 'gid', r'\bfault_id\b': 'gid',
-            r'\bdeposit_name\b': 'eng_name', r'\bmine_name\b': 'eng_name', r'\bsite_name\b': 'eng_name',
-            r'\barea_name\b': 'unit_name', r'\bfault_name\b': 'newtype', r'\bfault_type\b': 'newtype',
-            r'\bcommodity\b': 'major_comm', r'\bimportance\b': 'occ_imp',
-            r'\brock_type\b': 'main_litho', r'\blithology\b': 'main_litho',
-        }
-        
-        for wrong, correct in column_fixes.items():
-            sql = re.sub(wrong, correct, sql, flags=re.IGNORECASE)
+        sql, sql_lower = ctx
+        if any(name in sql_lower for name in _COLUMN_NAME_FIXES):
+            sql = _RE_COLUMN_FIX.sub(lambda m: _COLUMN_NAME_FIXES[m.group(1).lower()], sql)
         
         # Fix generic "id" → "gid"
-        sql = re.sub(r'(\w+)\.id\b(?!\w)', r'\1.gid', sql, flags=re.IGNORECASE)
-        sql = re.sub(r'\bSELECT\s+id\s*,', 'SELECT gid,', sql, flags=re.IGNORECASE)
-        sql = re.sub(r',\s*id\s+FROM', ', gid FROM', sql, flags=re.IGNORECASE)
+        if _RE_ID_WORD.search(sql):
+            sql = _RE_ALIAS_ID.sub(r'\1.gid', sql)
+            sql = _RE_SELECT_ID.sub('SELECT gid,', sql)
+            sql = _RE_TRAILING_ID.sub(', gid FROM', sql)
         
         return sql
     
-    def _fix_spatial_operations(self, sql: str) -> str:
+    def _fix_spatial_operations(self, ctx: SqlText) -> str:
         """Ensure both geometries in spatial ops have ST_SetSRID(..., 3857)."""
-        spatial_ops = ['ST_Intersects', 'ST_DWithin', 'ST_Within', 'ST_Contains', 'ST_Crosses']
-        
-        for op in spatial_ops:
-            # Pattern: op(geom, geom) → op(ST_SetSRID(geom, 3857), ST_SetSRID(geom, 3857))
-            pattern = rf'{op}\s*\(\s*(\w+\.)?geom\s*,\s*(\w+\.)?geom'
-            def fix_both(m):
-                a1, a2 = m.group(1) or '', m.group(2) or ''
-                return f'{op}(ST_SetSRID({a1}geom, 3857), ST_SetSRID({a2}geom, 3857)'
-            sql = re.sub(pattern, fix_both, sql, flags=re.IGNORECASE)
-            
-            # Handle mixed cases (one with ST_SetSRID, one without)
-            pattern2 = rf'{op}\s*\(\s*ST_SetSRID\s*\([^)]+\)\s*,\s*(\w+\.)?geom\b'
-            def fix_second(m):
-                alias = m.group(1) or ''
-                # Find the first argument
-                full_match = m.group(0)
-                first_arg = re.search(r'ST_SetSRID\([^)]+\)', full_match).group(0)
-                return f'{op}({first_arg}, ST_SetSRID({alias}geom, 3857)'
-            sql = re.sub(pattern2, fix_second, sql, flags=re.IGNORECASE)
+        sql, sql_lower = ctx
+        if not any(op in sql_lower for op in _SPATIAL_OPS):
+            return sql
         
-        return sql
+        def wrap(arg: str) -> str:
+            if arg[:10].lower() == 'st_setsrid':
+                return arg
+            return f'ST_SetSRID({arg}, 3857)'
+        
+        # op(geom, geom) → op(ST_SetSRID(geom, 3857), ST_SetSRID(geom, 3857)),
+        # including mixed cases where only one side is wrapped
+        def fix_args(m):
+            op, first_arg, second_arg = m.groups()
+            fixed_first, fixed_second = wrap(first_arg), wrap(second_arg)
+            if fixed_first is first_arg and fixed_second is second_arg:
+                return m.group(0)
+            return f'{_SPATIAL_OPS[op.lower()]}({fixed_first}, {fixed_second}'
+        
+        return _RE_SPATIAL_OP.sub(fix_args, sql)
     
-    def _ensure_geojson_geom(self, sql: str) -> str:
+    def _ensure_geojson_geom(self, ctx: SqlText) -> str:
         """Ensure geojson_geom is present for polygon/line tables and remove ST_Y/ST_X if present."""
-        sql_upper = sql.upper()
-        sql_lower = sql.lower()
-        
-        tables_needing_geojson = [
-            ('geology_master', 'polygon'),
-            ('geology_faults_contacts_master', 'line')
-        ]
+        sql, sql_lower = ctx
+        if 'geology_' not in sql_lower:
+            return sql
+        has_geojson = 'geojson_geom' in sql_lower
+        tables_present = {table for _, table in _RE_TABLE_REF.findall(sql_lower)}
         
         # Check if this is a pure polygon/line query (not a JOIN with mods)
-        is_point_table_in_query = any(
-            f'from {t}' in sql_lower or f'join {t}' in sql_lower 
-            for t in ['mods', 'borholes', 'surface_samples']
-        )
+        is_point_table_in_query = not tables_present.isdisjoint(_POINT_TABLES)
         
-        for table, geom_type in tables_needing_geojson:
-            table_in_from = f'from {table.lower()}' in sql_lower
-            table_in_join = f'join {table.lower()}' in sql_lower
-            
-            if table_in_from or table_in_join:
+        for table, geom_type, from_pattern, alias_pattern in _GEOJSON_TABLES:
+            if table in tables_present:
                 # If this is a PURE polygon/line query (no point tables), fix ST_Y/ST_X errors
                 if not is_point_table_in_query:
                     # Remove any ST_Y/ST_X calls which are wrong for polygon/line
                     if 'st_y(' in sql_lower or 'st_x(' in sql_lower:
                         logger.warning(f"Removing ST_Y/ST_X from {geom_type} query - these only work on points!")
                         # Remove the latitude/longitude columns entirely
-                        sql = re.sub(
-                            r',?\s*ST_Y\s*\([^)]+\)\s*AS\s+latitude',
-                            '', sql, flags=re.IGNORECASE
-                        )
-                        sql = re.sub(
-                            r',?\s*ST_X\s*\([^)]+\)\s*AS\s+longitude',
-                            '', sql, flags=re.IGNORECASE
-                        )
+                        sql = _RE_LATITUDE_COL.sub('', sql)
+                        sql = _RE_LONGITUDE_COL.sub('', sql)
                         # Clean up any double commas
-                        sql = re.sub(r',\s*,', ',', sql)
-                        sql = re.sub(r'SELECT\s*,', 'SELECT ', sql, flags=re.IGNORECASE)
+                        sql = _RE_DOUBLE_COMMA.sub(',', sql)
+                        sql = _RE_SELECT_COMMA.sub('SELECT ', sql)
                 
                 # Add geojson_geom if not present
-                if 'GEOJSON_GEOM' not in sql_upper:
-                    from_match = re.search(rf'\bFROM\s+{table}\b', sql, re.IGNORECASE)
+                if not has_geojson:
+                    from_match = from_pattern.search(sql)
                     if from_match and sql.strip().upper().startswith('SELECT'):
                         from_pos = from_match.start()
                         before_from = sql[:from_pos].rstrip().rstrip(',')
                         after_from = sql[from_pos:]
                         
-                        alias_match = re.search(rf'FROM\s+{table}\s+(\w+)', sql, re.IGNORECASE)
+                        alias_match = alias_pattern.search(sql)
                         geom_ref = f'{alias_match.group(1)}.geom' if alias_match else 'geom'
                         geojson = f'ST_AsGeoJSON(ST_Transform(ST_SetSRID({geom_ref}, 3857), 4326)) AS geojson_geom'
                         
@@ -571,63 +924,141 @@ class SQLGenerator:
         
         return sql
     
-    def _fix_commodity_logic(self, sql: str) -> str:
+    def _fix_commodity_logic(self, ctx: SqlText) -> str:
         """Fix AND → OR for major_comm/minor_comm searches."""
-        pattern = re.compile(
-            r"major_comm\s+ILIKE\s+('[^']+')\s+AND\s+minor_comm\s+ILIKE\s+\1",
-            re.IGNORECASE
-        )
+        # Cheap probe: the pattern needs "AND <whitespace> minor_comm"
+        sql, sql_lower = ctx
+        start = sql_lower.find('minor_comm')
+        while start != -1:
+            if sql_lower[:start].rstrip().endswith('and'):
+                break
+            start = sql_lower.find('minor_comm', start + 1)
+        else:
+            return sql
+        
         def replace_with_or(m):
             val = m.group(1)
             return f"(major_comm ILIKE {val} OR minor_comm ILIKE {val})"
-        return pattern.sub(replace_with_or, sql)
+        return _RE_COMMODITY_AND.sub(replace_with_or, sql)
     
     # =========================================================================
     # LIMIT EXTRACTION
     # =========================================================================
     
     def _extract_limit_from_query(self, query: str) -> Optional[int]:
-        """Extract limit if user explicitly requests a number."""
-        patterns = [
-            r'top\s+(\d+)', r'first\s+(\d+)', r'give\s+me\s+(\d+)',
-            r'show\s+(\d+)', r'get\s+(\d+)', r'nearest\s+(\d+)',
-            r'(\d+)\s+(?:nearest|closest|top|first)', r'limit\s+(?:to\s+)?(\d+)'
-        ]
+        """
+        Extract limit if user explicitly requests a number.
         
-        query_lower = query.lower()
-        for pattern in patterns:
-            match = re.search(pattern, query_lower)
-            if match:
-                return int(match.group(1))
+        Matches whole words only and returns the first qualifying number,
+        so "stop 5" and "3D" never match, punctuation is ignored ("top: 5"),
+        and "show 5 of the top 10" gives 5.
+        """
+        if not any(ch.isdecimal() for ch in query):
+            return None
+        
+        words = _RE_WORD.findall(query.lower())
+        for i, word in enumerate(words):
+            if not word.isdecimal():
+                continue
+            prev_word = words[i - 1] if i > 0 else ''
+            prev_prev = words[i - 2] if i > 1 else ''
+            next_word = words[i + 1] if i + 1 < len(words) else ''
+            if (
+                prev_word in _LIMIT_BEFORE_WORDS
+                or (prev_word == 'me' and prev_prev == 'give')
+                or (prev_word == 'to' and prev_prev == 'limit')
+                or next_word in _LIMIT_AFTER_WORDS
+            ):
+                return int(word)
         return None
     
     # =========================================================================
     # SQL GENERATION
     # =========================================================================
     
+    def _result_cache_key(self, query: str) -> Optional[str]:
+        """Normalized cache key for a query, or None if it must not be cached."""
+        key = _collapse_whitespace(query.lower())
+        if _RE_UNCACHEABLE.search(key):
+            return None
+        return key
+    
+    @staticmethod
+    def _query_signature(cache_key: str) -> frozenset:
+        """Entities a near-duplicate query must share: numbers, regions, commodities."""
+        return frozenset(
+            _RE_NUMBER.findall(cache_key)
+            + _RE_CITY.findall(cache_key)
+            + _RE_COMMODITY_WORD.findall(cache_key)
+        )
+    
+    async def _embed_query(self, cache_key: str) -> Optional[List[float]]:
+        """Embedding for the semantic cache tier (None if disabled or unavailable)."""
+        if settings.sql_semantic_cache_threshold <= 0:
+            return None
+        try:
+            return await get_embedding_service().embed(cache_key)
+        except Exception as e:
+            logger.warning(f"Query embedding failed, skipping semantic cache: {e}")
+            return None
+    
+    def _cache_result(self, cache_key: Optional[str], result: Dict[str, Any]):
+        """Store a generated result, evicting the least recently used."""
+        if not cache_key:
+            return
+        self._result_cache[cache_key] = copy.deepcopy(result)
+        self._result_cache.move_to_end(cache_key)
+        if len(self._result_cache) > SQL_RESULT_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
+    
     async def generate_sql(self, query: str) -> Dict[str, Any]:
         """Generate SQL from natural language query."""
+        result, _ = await self._generate_sql(query)
+        return result
+    
+    async def _generate_sql(self, query: str) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Generate SQL, also returning the result cache key the answer is
+        stored under (a near-duplicate's key on a semantic hit).
+        """
+        cache_key = self._result_cache_key(query)
+        cached = self._result_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            self._result_cache.move_to_end(cache_key)
+            logger.info(f"SQL cache hit: {cache_key}")
+            return copy.deepcopy(cached), cache_key
+        
+        # Near-duplicate tier: one embedding call instead of a full generation
+        query_vector = await self._embed_query(cache_key) if cache_key else None
+        if query_vector is not None:
+            near_key = self._semantic_index.best_match(
+                self._query_signature(cache_key), query_vector,
+                settings.sql_semantic_cache_threshold
+            )
+            if near_key is not None and near_key in self._result_cache:
+                self._result_cache.move_to_end(near_key)
+                logger.info(f"SQL semantic cache hit: {cache_key} ≈ {near_key}")
+                return copy.deepcopy(self._result_cache[near_key]), near_key
+        
         processed_query = self._preprocess_query(query)
         
         try:
-            dynamic_schema = self._build_dynamic_schema_prompt()
-            system_prompt = SYSTEM_PROMPT_TEMPLATE.format(dynamic_schema=dynamic_schema)
-            
             result = await self.ollama.generate_json(
                 prompt=f'Generate SQL for: "{processed_query}"',
-                system=system_prompt,
+                system=self._system_prompt,
                 temperature=0.0
             )
             
             if "sql_query" not in result:
                 raise ValueError("No sql_query in response")
             
-            sql = self._fix_sql(result["sql_query"])
-            query_type = self._determine_query_type(sql, result.get("query_type", "point"))
+            fixed = self._fix_sql(result["sql_query"])
+            sql = fixed.raw
+            query_type = self._determine_query_type(fixed, result.get("query_type", "point"))
             
             logger.info(f"Generated SQL: {sql}")
             
-            return {
+            generated = {
                 "sql_query": sql,
                 "query_type": query_type,
                 "description": result.get("description", ""),
@@ -635,11 +1066,16 @@ class SQLGenerator:
                 "reasoning": result.get("reasoning", "")
             }
             
+            self._cache_result(cache_key, generated)
+            if query_vector is not None:
+                self._semantic_index.add(cache_key, self._query_signature(cache_key), query_vector)
+            return generated, cache_key
+            
         except Exception as e:
             logger.error(f"SQL generation failed: {e}")
             raise ValueError(f"Failed to generate SQL: {e}")
     
-    def _determine_query_type(self, sql: str, suggested_type: str) -> str:
+    def _determine_query_type(self, ctx: SqlText, suggested_type: str) -> str:
         """
         ═══════════════════════════════════════════════════════════════════════
         CRITICAL FIX: Determine query_type based on OUTPUT columns AND tables!
@@ -650,7 +1086,7 @@ class SQLGenerator:
         - If geojson_geom is selected from faults table → LINE
         - If geojson_geom is selected from geology_master → POLYGON
         """
-        sql_lower = sql.lower()
+        sql_lower = ctx.lower
         
         # =====================================================================
         # RULE 1: If latitude/longitude are in SELECT → this is a POINT query
@@ -663,17 +1099,15 @@ class SQLGenerator:
         # RULE 2: Check the FROM clause to determine table type
         # =====================================================================
         
+        # One scan collects every (from|join, table) reference
+        table_refs = set(_RE_TABLE_REF.findall(sql_lower))
+        tables_present = {table for _, table in table_refs}
+        
         # Check for faults table first (more specific)
-        is_faults_query = (
-            'from geology_faults_contacts_master' in sql_lower or
-            'join geology_faults_contacts_master' in sql_lower
-        )
+        is_faults_query = 'geology_faults_contacts_master' in tables_present
         
         # Check for geology_master table
-        is_geology_query = (
-            'from geology_master' in sql_lower or
-            'join geology_master' in sql_lower
-        )
+        is_geology_query = 'geology_master' in tables_present
         
         # If ONLY faults table (no geology_master), it's LINE
         if is_faults_query and not is_geology_query:
@@ -688,14 +1122,14 @@ class SQLGenerator:
         # =====================================================================
         # RULE 3: If geojson_geom is in SELECT → check alias to determine source
         # =====================================================================
-        if 'as geojson_geom' in sql_lower or 'geojson_geom' in sql_lower:
+        if 'geojson_geom' in sql_lower:
             # Check if geojson is from faults table (look for f.geom pattern)
-            if re.search(r'st_asgeojson\s*\([^)]*f\.geom', sql_lower):
+            if _RE_GEOJSON_FROM_FAULTS.search(sql_lower):
                 logger.info("query_type = LINE (geojson_geom from faults alias 'f')")
                 return "line"
             
             # Check if geojson is from geology_master (look for g.geom pattern)
-            if re.search(r'st_asgeojson\s*\([^)]*g\.geom', sql_lower):
+            if _RE_GEOJSON_FROM_GEOLOGY.search(sql_lower):
                 logger.info("query_type = POLYGON (geojson_geom from geology_master alias 'g')")
                 return "polygon"
             
@@ -706,9 +1140,8 @@ class SQLGenerator:
         # =====================================================================
         # RULE 4: Check for point tables
         # =====================================================================
-        point_tables = ['mods', 'borholes', 'surface_samples']
-        for table in point_tables:
-            if f'from {table}' in sql_lower:
+        for table in _POINT_TABLES:
+            if ('from', table) in table_refs:
                 logger.info(f"query_type = POINT (from {table} table)")
                 return "point"
         
@@ -726,6 +1159,12 @@ class SQLGenerator:
         """Generate SQL with retry mechanism on validation failure."""
         attempt = 0
         attempt_history = []
+        # EXPLAIN failures by whitespace-normalized SQL; temperature 0 often
+        # repeats a failed query verbatim, so reuse the verdict instead of
+        # another database round-trip
+        failed_explains: Dict[str, Exception] = {}
+        # Cache entry the first attempt was served from (a near-duplicate's on a semantic hit)
+        served_key = self._result_cache_key(query)
         
         while attempt < max_retries:
             attempt += 1
@@ -733,20 +1172,32 @@ class SQLGenerator:
             
             try:
                 if attempt == 1:
-                    result = await self.generate_sql(query)
+                    result, served_key = await self._generate_sql(query)
                 else:
                     result = await self._regenerate_with_feedback(query, attempt_history, attempt)
                 
                 # Validate with EXPLAIN
-                explain_query = f"EXPLAIN {result['sql_query']}"
-                self.db.execute_query(explain_query)
+                explain_key = _collapse_whitespace(result['sql_query'])
+                if explain_key in failed_explains:
+                    logger.info("Same SQL as an earlier failed attempt, skipping EXPLAIN")
+                    raise failed_explains[explain_key]
+                try:
+                    self.db.execute_query(f"EXPLAIN {result['sql_query']}")
+                except Exception as e:
+                    failed_explains[explain_key] = e
+                    raise
                 
                 logger.info(f"SQL validation passed on attempt {attempt}")
+                if attempt > 1:
+                    self._cache_result(self._result_cache_key(query), result)
                 return {**result, "attempts": attempt, "failed_attempts": attempt_history}
                 
             except Exception as e:
                 error_msg = str(e)
                 logger.warning(f"Attempt {attempt} failed: {error_msg}")
+                if attempt == 1:
+                    # Don't keep serving SQL that failed validation
+                    self._result_cache.pop(served_key, None)
                 attempt_history.append({
                     'sql': result.get('sql_query', 'N/A') if 'result' in dir() else 'N/A',
                     'error': error_msg
@@ -778,20 +1229,18 @@ Fix ALL errors. Common issues:
 
 Generate corrected SQL."""
         
-        dynamic_schema = self._build_dynamic_schema_prompt()
-        system_prompt = SYSTEM_PROMPT_TEMPLATE.format(dynamic_schema=dynamic_schema)
-        
         result = await self.ollama.generate_json(
             prompt=retry_prompt,
-            system=system_prompt,
+            system=self._system_prompt,
             temperature=0.0
         )
         
         if "sql_query" not in result:
             raise ValueError("No sql_query in regenerated response")
         
-        sql = self._fix_sql(result["sql_query"])
-        query_type = self._determine_query_type(sql, result.get("query_type", "point"))
+        fixed = self._fix_sql(result["sql_query"])
+        sql = fixed.raw
+        query_type = self._determine_query_type(fixed, result.get("query_type", "point"))
         
         return {
             "sql_query": sql,
@@ -855,16 +1304,25 @@ Generate corrected SQL."""
             }
     
     def refresh_column_values(self):
-        """Refresh column values from database."""
-        self._load_column_values()
-        self._build_reverse_mapping()
+        """Refresh column values from database (and the prompt built from them)."""
+        self._column_values = {}
+        self._load_column_values(_PROMPT_COLUMNS, limit=PROMPT_SAMPLE_SIZE)
+        # Reverse mapping is rebuilt (with the full column set) on next use
+        self.__dict__.pop('_reverse_mapping', None)
+        self._system_prompt = self._build_system_prompt()
+        self._result_cache.clear()
+        self._semantic_index.clear()
 
 
 # Singleton
 _sql_generator: Optional[SQLGenerator] = None
+_sql_generator_lock = threading.Lock()
 
 def get_sql_generator() -> SQLGenerator:
+    # Construction loads column values from the database; never run it twice
     global _sql_generator
     if _sql_generator is None:
-        _sql_generator = SQLGenerator()
+        with _sql_generator_lock:
+            if _sql_generator is None:
+                _sql_generator = SQLGenerator()
     return _sql_generator
\ No newline at end of file
@@ -16,12 +16,110 @@ Fixed:
 
 import logging
 import json
-from typing import Dict, Any, List, Optional
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import shapely
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 from database.postgis_client import get_postgis_client
 
 logger = logging.getLogger(__name__)
 
+# ST_AsGeoJSON strings dominate polygon/line payloads; orjson parses them
+# several times faster (its JSONDecodeError subclasses json's)
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+# Row keys that carry geometry rather than feature properties
+POINT_GEOMETRY_KEYS = frozenset({'latitude', 'longitude', 'geom', 'geojson_geom', 'geom_wkb'})
+SHAPE_GEOMETRY_KEYS = frozenset({'geom', 'geojson_geom', 'geom_wkb'})
+
+# Status codes returned by validate_coords_batch
+COORD_VALID = 0
+COORD_NULL = 1          # missing, NaN/Inf or non-numeric
+COORD_SWAPPED = 2       # lat/lon transposed; swap to fix
+COORD_OUT_OF_BOUNDS = 3 # outside Saudi bounds (kept, may be valid)
+
+
+def property_columns(data: List[Dict], skip_keys: frozenset) -> Dict[str, bool]:
+    """
+    Classify each property column once: True if its values pass through
+    as-is (int/float/bool), False if they are stringified. Columns come from
+    one cursor, so the first non-null value decides for the whole column.
+    """
+    columns = {}
+    for key in data[0]:
+        if key.lower() in skip_keys:
+            continue
+        sample = next((row.get(key) for row in data if row.get(key) is not None), None)
+        columns[key] = isinstance(sample, (int, float, bool))
+    return columns
+
+
+def bounds_from_coords(lons: List[float], lats: List[float]) -> Optional[Dict[str, float]]:
+    """Bounding box and vertex centroid of coordinate lists (None if empty)."""
+    if not lats or not lons:
+        return None
+    
+    bounds = {
+        "min_lat": min(lats),
+        "max_lat": max(lats),
+        "min_lon": min(lons),
+        "max_lon": max(lons),
+        "center_lat": sum(lats) / len(lats),
+        "center_lon": sum(lons) / len(lons)
+    }
+    
+    logger.info(f"Calculated bounds: center=({bounds['center_lat']:.4f}, {bounds['center_lon']:.4f})")
+    return bounds
+
+
+def geometries_from_wkb(values: List[Any]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Decode WKB column values (bytes/memoryview) into GeoJSON geometry dicts
+    with one vectorized shapely pass. None where missing or invalid.
+    """
+    blobs = np.array([bytes(v) if v is not None else None for v in values], dtype=object)
+    geometries = shapely.from_wkb(blobs, on_invalid="ignore")
+    return [_json_loads(text) if text is not None else None for text in shapely.to_geojson(geometries)]
+
+
+def _to_float_array(values: List[Any]) -> np.ndarray:
+    """Convert raw coordinate values to float64 (None/unconvertible → NaN)."""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (ValueError, TypeError):
+        def to_float(value):
+            try:
+                return float(value)
+            except (ValueError, TypeError):
+                return np.nan
+        return np.fromiter((to_float(v) for v in values), dtype=np.float64, count=len(values))
+
+
+def validate_coords_batch(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Classify coordinate pairs for the Saudi Arabia region (with some buffer).
+    Returns a uint8 array of COORD_* status codes, one per pair.
+    """
+    bad = ~(np.isfinite(lats) & np.isfinite(lons))
+    in_bounds = (lats >= 10) & (lats <= 35) & (lons >= 30) & (lons <= 60)
+    transposed = (lats >= 30) & (lats <= 60) & (lons >= 10) & (lons <= 35)
+    outside = ~bad & ~in_bounds
+    
+    # Masks are disjoint, so the weighted sum is the status code
+    return (
+        bad * np.uint8(COORD_NULL)
+        + (outside & transposed) * np.uint8(COORD_SWAPPED)
+        + (outside & ~transposed) * np.uint8(COORD_OUT_OF_BOUNDS)
+    ).astype(np.uint8)
+
 
 class Visualizer2D:
     """Prepares geospatial data for 2D/3D map visualization."""
@@ -29,46 +127,6 @@ class Visualizer2D:
     def __init__(self):
         self.db = get_postgis_client()
     
-    def _validate_coordinates(self, lat: float, lon: float) -> tuple:
-        """
-        Validate and fix coordinates for Saudi Arabia region.
-        Returns (lat, lon) or (None, None) if invalid.
-        """
-        if lat is None or lon is None:
-            return None, None
-        
-        try:
-            lat = float(lat)
-            lon = float(lon)
-        except (ValueError, TypeError):
-            logger.warning(f"Could not convert coordinates to float: lat={lat}, lon={lon}")
-            return None, None
-        
-        # Check for NaN or Inf
-        import math
-        if math.isnan(lat) or math.isnan(lon) or math.isinf(lat) or math.isinf(lon):
-            logger.warning(f"Invalid coordinate values (NaN/Inf): lat={lat}, lon={lon}")
-            return None, None
-        
-        # Saudi Arabia bounds check (with some buffer)
-        lat_valid = 10 <= lat <= 35
-        lon_valid = 30 <= lon <= 60
-        
-        if lat_valid and lon_valid:
-            return lat, lon
-        
-        # Check if coordinates are swapped (common mistake)
-        if 30 <= lat <= 60 and 10 <= lon <= 35:
-            logger.warning(f"Swapped coordinates detected, fixing: ({lat}, {lon}) -> ({lon}, {lat})")
-            return lon, lat
-        
-        # Even if outside Saudi bounds, still return them (might be valid edge cases)
-        # Just log a warning
-        if not (lat_valid and lon_valid):
-            logger.debug(f"Coordinates outside Saudi bounds (may be valid): lat={lat}, lon={lon}")
-        
-        return lat, lon
-    
     def _detect_geometry_type(self, data: List[Dict], query_type: str = None) -> str:
         """Detect geometry type from data or query_type."""
         
@@ -83,10 +141,21 @@ class Visualizer2D:
         
         row = data[0]
         
+        # Check for WKB geometry column
+        if row.get('geom_wkb') is not None:
+            geom = geometries_from_wkb([row['geom_wkb']])[0]
+            geom_type = (geom or {}).get('type', '').lower()
+            if 'polygon' in geom_type:
+                logger.info("Detected geometry type from geom_wkb: polygon")
+                return 'polygon'
+            if 'line' in geom_type:
+                logger.info("Detected geometry type from geom_wkb: line")
+                return 'line'
+        
         # Check for GeoJSON geometry column
         if 'geojson_geom' in row:
             try:
-                geom = json.loads(row['geojson_geom']) if isinstance(row['geojson_geom'], str) else row['geojson_geom']
+                geom = _json_loads(row['geojson_geom']) if isinstance(row['geojson_geom'], str) else row['geojson_geom']
                 geom_type = geom.get('type', '').lower()
                 if 'polygon' in geom_type:
                     logger.info("Detected geometry type from geojson_geom: polygon")
@@ -105,32 +174,56 @@ class Visualizer2D:
         logger.warning("Could not detect geometry type, defaulting to 'point'")
         return 'point'
     
-    def _build_point_geojson(self, data: List[Dict]) -> Dict[str, Any]:
-        """Build GeoJSON for point data."""
+    def _validate_coordinate_arrays(
+        self,
+        data: List[Dict],
+        lat_field: str = "latitude",
+        lon_field: str = "longitude"
+    ) -> tuple:
+        """
+        Validate and fix coordinates for all rows at once.
+        Returns (lats, lons, null_mask, invalid_mask) with swapped pairs fixed;
+        out-of-bounds coordinates are kept (might be valid edge cases).
+        """
+        raw_lats = [row.get(lat_field) for row in data]
+        raw_lons = [row.get(lon_field) for row in data]
+        null = np.fromiter(
+            (lat is None or lon is None for lat, lon in zip(raw_lats, raw_lons)),
+            dtype=bool, count=len(data)
+        )
+        lats = _to_float_array(raw_lats)
+        lons = _to_float_array(raw_lons)
+        status = validate_coords_batch(lats, lons)
+        
+        # NaN/Inf (or unconvertible) coordinates on non-null rows
+        invalid = ~null & (status == COORD_NULL)
+        swapped = status == COORD_SWAPPED
+        
+        if invalid.any():
+            logger.warning(f"Invalid coordinate values (NaN/Inf/non-numeric) in {int(invalid.sum())} rows")
+        if swapped.any():
+            logger.warning(f"Swapped coordinates detected in {int(swapped.sum())} rows, fixing")
+        
+        return np.where(swapped, lons, lats), np.where(swapped, lats, lons), null, invalid
+    
+    def _build_point_geojson(self, data: List[Dict]) -> Tuple[Dict[str, Any], Optional[Dict[str, float]]]:
+        """Build GeoJSON for point data, with its bounds."""
         features = []
-        skipped_null = 0
-        skipped_invalid = 0
-        
-        for row in data:
-            lat = row.get('latitude')
-            lon = row.get('longitude')
-            
-            # Check for null values before validation
-            if lat is None or lon is None:
-                skipped_null += 1
-                continue
-            
-            lat, lon = self._validate_coordinates(lat, lon)
-            if lat is None or lon is None:
-                skipped_invalid += 1
-                continue
-            
+        columns = property_columns(data, POINT_GEOMETRY_KEYS) if data else {}
+        lats, lons, null, invalid = self._validate_coordinate_arrays(data)
+        skipped_null = int(null.sum())
+        skipped_invalid = int(invalid.sum())
+        
+        # Only surviving rows get a feature
+        valid_rows = np.flatnonzero(~(null | invalid))
+        valid_lats = lats[valid_rows].tolist()
+        valid_lons = lons[valid_rows].tolist()
+        for i, lat, lon in zip(valid_rows.tolist(), valid_lats, valid_lons):
             # Build properties (exclude geometry fields)
-            properties = {}
-            for k, v in row.items():
-                if k.lower() not in ['latitude', 'longitude', 'geom', 'geojson_geom']:
-                    if v is not None:
-                        properties[k] = v if isinstance(v, (int, float, bool)) else str(v)
+            properties = {
+                k: v if columns[k] else str(v)
+                for k, v in data[i].items() if v is not None and k in columns
+            }
             
             properties['_geometry_type'] = 'point'
             
@@ -154,36 +247,58 @@ class Visualizer2D:
         else:
             logger.info(f"Point GeoJSON: Built {valid} features from {total} rows")
         
-        return {"type": "FeatureCollection", "features": features}
+        # Bounds come from the validated coordinate arrays, not a second walk
+        return {"type": "FeatureCollection", "features": features}, bounds_from_coords(valid_lons, valid_lats)
+    
+    def _wkb_geometries(self, data: List[Dict]) -> Optional[List[Optional[Dict[str, Any]]]]:
+        """Batch-decoded geom_wkb geometries, or None if the rows carry no WKB column."""
+        if not data or 'geom_wkb' not in data[0]:
+            return None
+        return geometries_from_wkb([row.get('geom_wkb') for row in data])
     
-    def _build_polygon_geojson(self, data: List[Dict]) -> Dict[str, Any]:
-        """Build GeoJSON for polygon data (geology_master)."""
+    def _build_polygon_geojson(self, data: List[Dict]) -> Tuple[Dict[str, Any], Optional[Dict[str, float]]]:
+        """Build GeoJSON for polygon data (geology_master), with its bounds."""
         features = []
+        lons, lats = [], []
         skipped_no_geom = 0
         skipped_parse_error = 0
+        # Joins repeat the same geometry string across rows; parse each once
+        parsed: Dict[str, Any] = {}
+        
+        wkb_geometries = self._wkb_geometries(data)
+        columns = property_columns(data, SHAPE_GEOMETRY_KEYS) if data else {}
         
-        for row in data:
-            geojson_str = row.get('geojson_geom')
+        for i, row in enumerate(data):
+            geojson_str = row.get('geojson_geom') or (wkb_geometries and wkb_geometries[i])
             if not geojson_str:
                 skipped_no_geom += 1
                 continue
             
-            try:
-                geometry = json.loads(geojson_str) if isinstance(geojson_str, str) else geojson_str
-            except (json.JSONDecodeError, TypeError) as e:
-                skipped_parse_error += 1
-                logger.debug(f"Failed to parse geojson_geom: {e}")
-                continue
+            if not isinstance(geojson_str, str):
+                geometry = geojson_str
+            elif geojson_str in parsed:
+                geometry = parsed[geojson_str]
+            else:
+                try:
+                    geometry = parsed[geojson_str] = _json_loads(geojson_str)
+                except (json.JSONDecodeError, TypeError) as e:
+                    skipped_parse_error += 1
+                    logger.debug(f"Failed to parse geojson_geom: {e}")
+                    continue
             
             # Build properties
-            properties = {}
-            for k, v in row.items():
-                if k.lower() not in ['geom', 'geojson_geom']:
-                    if v is not None:
-                        properties[k] = v if isinstance(v, (int, float, bool)) else str(v)
+            properties = {
+                k: v if columns[k] else str(v)
+                for k, v in row.items() if v is not None and k in columns
+            }
             
             properties['_geometry_type'] = 'polygon'
             
+            # Accumulate bounds while the geometry is at hand
+            for lon, lat in self._extract_all_coords(geometry):
+                lons.append(lon)
+                lats.append(lat)
+            
             features.append({
                 "type": "Feature",
                 "geometry": geometry,
@@ -201,36 +316,51 @@ class Visualizer2D:
         else:
             logger.info(f"Polygon GeoJSON: Built {valid} features from {total} rows")
         
-        return {"type": "FeatureCollection", "features": features}
+        return {"type": "FeatureCollection", "features": features}, bounds_from_coords(lons, lats)
     
-    def _build_line_geojson(self, data: List[Dict]) -> Dict[str, Any]:
-        """Build GeoJSON for line data (faults/contacts)."""
+    def _build_line_geojson(self, data: List[Dict]) -> Tuple[Dict[str, Any], Optional[Dict[str, float]]]:
+        """Build GeoJSON for line data (faults/contacts), with its bounds."""
         features = []
+        lons, lats = [], []
         skipped_no_geom = 0
         skipped_parse_error = 0
+        # Joins repeat the same geometry string across rows; parse each once
+        parsed: Dict[str, Any] = {}
+        
+        wkb_geometries = self._wkb_geometries(data)
+        columns = property_columns(data, SHAPE_GEOMETRY_KEYS) if data else {}
         
-        for row in data:
-            geojson_str = row.get('geojson_geom')
+        for i, row in enumerate(data):
+            geojson_str = row.get('geojson_geom') or (wkb_geometries and wkb_geometries[i])
             if not geojson_str:
                 skipped_no_geom += 1
                 continue
             
-            try:
-                geometry = json.loads(geojson_str) if isinstance(geojson_str, str) else geojson_str
-            except (json.JSONDecodeError, TypeError) as e:
-                skipped_parse_error += 1
-                logger.debug(f"Failed to parse geojson_geom: {e}")
-                continue
+            if not isinstance(geojson_str, str):
+                geometry = geojson_str
+            elif geojson_str in parsed:
+                geometry = parsed[geojson_str]
+            else:
+                try:
+                    geometry = parsed[geojson_str] = _json_loads(geojson_str)
+                except (json.JSONDecodeError, TypeError) as e:
+                    skipped_parse_error += 1
+                    logger.debug(f"Failed to parse geojson_geom: {e}")
+                    continue
             
             # Build properties
-            properties = {}
-            for k, v in row.items():
-                if k.lower() not in ['geom', 'geojson_geom']:
-                    if v is not None:
-                        properties[k] = v if isinstance(v, (int, float, bool)) else str(v)
+            properties = {
+                k: v if columns[k] else str(v)
+                for k, v in row.items() if v is not None and k in columns
+            }
             
             properties['_geometry_type'] = 'line'
             
+            # Accumulate bounds while the geometry is at hand
+            for lon, lat in self._extract_all_coords(geometry):
+                lons.append(lon)
+                lats.append(lat)
+            
             features.append({
                 "type": "Feature",
                 "geometry": geometry,
@@ -248,14 +378,19 @@ class Visualizer2D:
         else:
             logger.info(f"Line GeoJSON: Built {valid} features from {total} rows")
         
-        return {"type": "FeatureCollection", "features": features}
+        return {"type": "FeatureCollection", "features": features}, bounds_from_coords(lons, lats)
     
     def to_geojson(self, data: List[Dict], query_type: str = None) -> Dict[str, Any]:
         """Convert query results to GeoJSON based on geometry type."""
-        
+        return self._build_geojson(data, query_type)[0]
+    
+    def _build_geojson(
+        self, data: List[Dict], query_type: str = None
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, float]]]:
+        """to_geojson plus bounds, computed in the same pass over the geometries."""
         if not data:
             logger.warning("to_geojson called with empty data")
-            return {"type": "FeatureCollection", "features": []}
+            return {"type": "FeatureCollection", "features": []}, None
         
         # Debug: log first row structure
         logger.info(f"to_geojson: Processing {len(data)} rows, query_type={query_type}")
@@ -286,20 +421,9 @@ class Visualizer2D:
                 lons.append(lon)
                 lats.append(lat)
         
-        if not lats or not lons:
+        bounds = bounds_from_coords(lons, lats)
+        if bounds is None:
             logger.warning("No valid coordinates found for bounds calculation")
-            return None
-        
-        bounds = {
-            "min_lat": min(lats),
-            "max_lat": max(lats),
-            "min_lon": min(lons),
-            "max_lon": max(lons),
-            "center_lat": sum(lats) / len(lats),
-            "center_lon": sum(lons) / len(lons)
-        }
-        
-        logger.info(f"Calculated bounds: center=({bounds['center_lat']:.4f}, {bounds['center_lon']:.4f})")
         return bounds
     
     def _extract_all_coords(self, geometry: Dict) -> List[tuple]:
@@ -362,8 +486,7 @@ class Visualizer2D:
             if has_lat and has_lon:
                 logger.info(f"Sample coordinates: lat={sample['latitude']}, lon={sample['longitude']}")
         
-        geojson = self.to_geojson(data, query_type)
-        bounds = self.get_bounds(geojson)
+        geojson, bounds = self._build_geojson(data, query_type)
         
         # Detect layer type
         layer_type = "point"
@@ -410,16 +533,15 @@ class Visualizer2D:
         weight_field: str = None
     ) -> List[List[float]]:
         """Prepare heatmap data as [[lat, lon, weight], ...]"""
-        heatmap_data = []
-        skipped = 0
-        
-        for row in data:
-            lat, lon = self._validate_coordinates(row.get(lat_field), row.get(lon_field))
-            if lat and lon:
-                weight = float(row.get(weight_field, 1.0)) if weight_field else 1.0
-                heatmap_data.append([lat, lon, weight])
-            else:
-                skipped += 1
+        lats, lons, null, invalid = self._validate_coordinate_arrays(data, lat_field, lon_field)
+        
+        # Zero coordinates count as missing, as in the original truthiness check
+        valid_rows = np.flatnonzero(~(null | invalid) & (lats != 0) & (lons != 0))
+        heatmap_data = [
+            [lat, lon, float(data[i].get(weight_field, 1.0)) if weight_field else 1.0]
+            for i, lat, lon in zip(valid_rows.tolist(), lats[valid_rows].tolist(), lons[valid_rows].tolist())
+        ]
+        skipped = len(data) - len(heatmap_data)
         
         if skipped > 0:
             logger.warning(f"Heatmap: Skipped {skipped} rows with invalid coordinates")
@@ -434,12 +556,12 @@ class Visualizer2D:
         max_cluster_radius: int = 50
     ) -> Dict[str, Any]:
         """Prepare cluster config for marker clustering."""
-        geojson = self.to_geojson(data, query_type='point')
+        geojson, bounds = self._build_geojson(data, query_type='point')
         
         return {
             "layer_name": layer_name,
             "geojson": geojson,
-            "bounds": self.get_bounds(geojson),
+            "bounds": bounds,
             "feature_count": len(geojson.get("features", [])),
             "cluster_options": {"maxClusterRadius": max_cluster_radius}
         }
@@ -461,10 +583,13 @@ class Visualizer2D:
 
 
 _visualizer_2d: Optional[Visualizer2D] = None
+_visualizer_2d_lock = threading.Lock()
 
 def get_visualizer_2d() -> Visualizer2D:
     """Get or create the global 2D visualizer."""
     global _visualizer_2d
     if _visualizer_2d is None:
-        _visualizer_2d = Visualizer2D()
+        with _visualizer_2d_lock:
+            if _visualizer_2d is None:
+                _visualizer_2d = Visualizer2D()
     return _visualizer_2d
\ No newline at end of file
@@ -3,7 +3,7 @@
 GEOSPATIAL RAG - ARABIC VOICE PROCESSOR
 =============================================================================
 Pipeline:
-  Arabic audio -> Whisper (task=translate) -> English text
+  Arabic audio -> Whisper (faster-whisper, or openai-whisper) -> English text
   -> Geospatial Agent (English) -> English output
   -> Google Translate (EN->AR) -> Arabic text
   -> Google TTS (AR) -> MP3 audio (base64)
@@ -12,39 +12,244 @@ This module integrates Arabic voice interaction with the geospatial RAG system.
 =============================================================================
 """
 
+import asyncio
 import base64
+import functools
+import importlib.util
+import io
 import os
+import re
 import tempfile
+import threading
 import logging
-from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, AsyncIterator, Union, Literal
+
+import numpy as np
 
 from config import settings
 
 logger = logging.getLogger(__name__)
 
-# Check if dependencies are available
-VOICE_AVAILABLE = False
+# Voice services, set by _initialize_voice_services
 whisper_model = None
+whisper_pipeline = None
 translate_client = None
 tts_client = None
 gcp_credentials = None
 
+# SIMD base64 for TTS audio payloads
 try:
-    import whisper
-    WHISPER_AVAILABLE = True
+    import pybase64
+    PYBASE64_AVAILABLE = True
 except ImportError:
-    WHISPER_AVAILABLE = False
-    print("WARNING: Whisper not installed. Run: pip install openai-whisper")
+    PYBASE64_AVAILABLE = False
 
-try:
-    from google.oauth2 import service_account
-    from google.cloud import translate_v3
-    from google.cloud import texttospeech
-    GOOGLE_AVAILABLE = True
-except ImportError:
-    GOOGLE_AVAILABLE = False
+
+def _module_installed(name: str) -> bool:
+    """Check that a module can be imported without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ImportError:
+        return False
+
+
+# Whisper (Torch/CTranslate2) and Google Cloud modules are heavy to import, so
+# only their presence is checked here; _initialize_voice_services imports them
+# the first time an ArabicVoiceProcessor is created.
+torch = None
+whisper = None
+decode_audio = None
+service_account = None
+translate_v3 = None
+texttospeech = None
+
+# faster-whisper (CTranslate2, int8) is preferred; openai-whisper is the fallback
+FASTER_WHISPER_AVAILABLE = _module_installed("faster_whisper")
+OPENAI_WHISPER_AVAILABLE = _module_installed("whisper")
+
+WHISPER_AVAILABLE = FASTER_WHISPER_AVAILABLE or OPENAI_WHISPER_AVAILABLE
+if not WHISPER_AVAILABLE:
+    print("WARNING: Whisper not installed. Run: pip install faster-whisper")
+
+GOOGLE_AVAILABLE = all(
+    _module_installed(name)
+    for name in ("google.oauth2", "google.cloud.translate_v3", "google.cloud.texttospeech")
+)
+if not GOOGLE_AVAILABLE:
     logger.warning("Google Cloud libraries not installed. Run: pip install google-cloud-translate google-cloud-texttospeech")
 
+# Until the services are initialized, report whether a Whisper backend is installed
+VOICE_AVAILABLE = WHISPER_AVAILABLE
+
+
+# Emojis deleted by _clean_for_tts in one str.translate pass:
+# common symbols, emoji range, dingbats
+_TTS_STRIP_TABLE = dict.fromkeys(
+    [ord(ch) for ch in '📊🔵💎🪨📐🎯📏✖️⭕🔲🔀📈🧭']
+    + list(range(0x1F300, 0x1FA00))
+    + list(range(0x2700, 0x27C0))
+)
+
+# _clean_for_tts substitutions, applied in order before line cleanup
+_TTS_CLEAN_PATTERNS = [
+    # Markdown formatting
+    (re.compile(r'\*\*([^*]+)\*\*'), r'\1'),  # **bold** -> bold
+    (re.compile(r'\*([^*]+)\*'), r'\1'),      # *italic* -> italic
+    (re.compile(r'`([^`]+)`'), r'\1'),         # `code` -> code
+    (re.compile(r'#+\s*'), ''),                 # Headers
+    # Decorative lines (3+ dashes/underscores/equals)
+    (re.compile(r'[─━═─_]{3,}'), ''),
+    # Analysis suggestions section: interactive, shouldn't be read aloud
+    (re.compile(r'تحليل مكاني متاح.*$', re.MULTILINE | re.DOTALL), ''),  # "Spatial analysis available" and everything after
+    (re.compile(r'────────────────.*$', re.MULTILINE | re.DOTALL), ''),   # Decorative line and everything after
+    (re.compile(r'^\s*[٠١٢٣٤٥٦٧٨٩]\s*[\.\)]\s*.*$', re.MULTILINE | re.DOTALL), ''),  # Lines starting with Arabic numerals
+    # Arabic numerals in circles/boxes at start of lines (like ١, ٢, ٣, ٤)
+    (re.compile(r'^[\s]*[٠١٢٣٤٥٦٧٨٩]\s*[\.\)]\s*', re.MULTILINE), ''),
+    # Bullet points and list markers
+    (re.compile(r'^[\s]*[•·▪▫]\s*', re.MULTILINE), ''),
+    # Extra whitespace
+    (re.compile(r'\s+'), ' '),       # Multiple spaces -> single space
+    (re.compile(r'\n\s*\n'), '\n'),  # Multiple newlines -> single newline
+]
+_RE_TTS_PERIODS = re.compile(r'\.{2,}')
+_RE_TTS_SEPARATOR = re.compile(r'[。.؟!…،\n]')
+_RE_TTS_WHITESPACE = re.compile(r'\s+')
+
+# Strings per Translate v3 request (API maximum is 1024)
+TRANSLATE_BATCH_SIZE = 1024
+
+# Repeated phrases (greetings, error templates) skip the network (LRU)
+TRANSLATION_CACHE_SIZE = 512
+TTS_CACHE_SIZE = 512
+
+# Concurrent Google TTS requests per synthesis call (stays under quota)
+TTS_MAX_CONCURRENCY = 8
+
+# Whisper runs on its own threads so transcription never blocks the event
+# loop; CTranslate2 (and torch) release the GIL while decoding
+WHISPER_WORKERS = 2
+_whisper_executor = ThreadPoolExecutor(max_workers=WHISPER_WORKERS, thread_name_prefix="whisper")
+
+# openai-whisper installs KV-cache hooks on the shared model for each decode,
+# so concurrent transcribe calls corrupt each other's caches; only
+# CTranslate2 (num_workers=WHISPER_WORKERS) decodes in parallel
+_openai_whisper_lock = threading.Lock()
+
+# "cuda" or "cpu"; empty picks CUDA whenever a GPU is visible
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "").strip().lower()
+
+# Whisper input is 16 kHz mono; clips shorter than SHORT_AUDIO_SECONDS fit a
+# single 30 s decoding window
+WHISPER_SAMPLE_RATE = 16000
+SHORT_AUDIO_SECONDS = 15
+
+# Speech segments decoded per batch by faster-whisper's batched pipeline
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "16"))
+
+# Arabic speech -> English strategy:
+#   two_step - Whisper transcribes Arabic, Google Translate produces English
+#   direct   - one Whisper task="translate" pass, no Google Translate call
+VOICE_STT_MODE = os.getenv("VOICE_STT_MODE", "two_step").strip().lower()
+if VOICE_STT_MODE not in ("two_step", "direct"):
+    logger.warning(f"Unknown VOICE_STT_MODE '{VOICE_STT_MODE}', using two_step")
+    VOICE_STT_MODE = "two_step"
+
+
+def _load_samples(audio: Union[str, bytes]) -> np.ndarray:
+    """Decode an audio file path or raw bytes to 16 kHz mono float32 samples."""
+    if isinstance(audio, bytes):
+        # PyAV reads the container straight from memory
+        return decode_audio(io.BytesIO(audio), sampling_rate=WHISPER_SAMPLE_RATE)
+    if FASTER_WHISPER_AVAILABLE:
+        return decode_audio(audio, sampling_rate=WHISPER_SAMPLE_RATE)
+    return whisper.load_audio(audio, sr=WHISPER_SAMPLE_RATE)
+
+
+def _b64encode(data: bytes) -> str:
+    """Base64-encode audio bytes to str (pybase64 when installed)."""
+    if PYBASE64_AVAILABLE:
+        return pybase64.b64encode_as_string(data)
+    return base64.b64encode(data).decode("utf-8")
+
+
+# MPEG Layer III tables for locating the Xing/Info frame of a TTS MP3 part
+_MP3_BITRATES_KBPS = {
+    True: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),  # MPEG-1
+    False: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),    # MPEG-2/2.5
+}
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _id3_length(data: bytes) -> int:
+    """Size of a leading ID3v2 tag, or 0."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _info_frame_length(data: bytes, offset: int) -> int:
+    """Length of a Xing/Info header frame at offset, or 0 if it is an audio frame."""
+    header = data[offset:offset + 4]
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return 0
+    version = (header[1] >> 3) & 0x3
+    layer = (header[1] >> 1) & 0x3
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return 0
+    
+    mpeg1 = version == 3
+    mono = (header[3] >> 6) == 3
+    side_info = (17 if mono else 32) if mpeg1 else (9 if mono else 17)
+    crc = 0 if header[1] & 0x1 else 2
+    tag_offset = offset + 4 + crc + side_info
+    if data[tag_offset:tag_offset + 4] not in (b"Xing", b"Info"):
+        return 0
+    
+    bitrate = _MP3_BITRATES_KBPS[mpeg1][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 0x1
+    return (144 if mpeg1 else 72) * bitrate // sample_rate + padding
+
+
+def _mp3_stream_part(part: bytes, first: bool) -> bytes:
+    """
+    Prepare one synthesized MP3 part for concatenation: drop its Xing/Info
+    frame (frame counts that describe this part alone) and, after the first
+    part, its ID3 tag.
+    """
+    id3 = _id3_length(part)
+    start = id3 + _info_frame_length(part, id3)
+    if first:
+        return part[:id3] + part[start:] if start > id3 else part
+    return part[start:]
+
+
+def _join_mp3_parts(parts: List[bytes]) -> bytes:
+    """Concatenate MP3 parts into one stream with a single ID3 tag."""
+    return b"".join(_mp3_stream_part(part, i == 0) for i, part in enumerate(parts))
+
+
+def _cache_get(cache: OrderedDict, key):
+    """LRU lookup: return the cached value (or None) and mark it recently used."""
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _cache_put(cache: OrderedDict, key, value, max_size: int):
+    """LRU insert, evicting the least recently used entry past max_size."""
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > max_size:
+        cache.popitem(last=False)
+
 
 def _build_gcp_credentials():
     """
@@ -80,9 +285,27 @@ def _build_gcp_credentials():
         return None
 
 
+_voice_services_lock = threading.Lock()
+_voice_services_initialized = False
+
+
 def _initialize_voice_services():
-    """Initialize Whisper and Google Cloud services."""
-    global whisper_model, translate_client, tts_client, gcp_credentials, VOICE_AVAILABLE
+    """Import and initialize Whisper and Google Cloud services (once)."""
+    global _voice_services_initialized
+    
+    if _voice_services_initialized:
+        return VOICE_AVAILABLE
+    with _voice_services_lock:
+        if not _voice_services_initialized:
+            _load_voice_services()
+            _voice_services_initialized = True
+    return VOICE_AVAILABLE
+
+
+def _load_voice_services():
+    """Import the heavy voice modules and build the Whisper/Google clients."""
+    global whisper_model, whisper_pipeline, translate_client, tts_client, gcp_credentials, VOICE_AVAILABLE
+    global torch, whisper, decode_audio, service_account, translate_v3, texttospeech
     
     # Initialize Whisper
     if WHISPER_AVAILABLE:
@@ -93,8 +316,34 @@ def _initialize_voice_services():
             if model_name == "small":
                 logger.warning("⚠️  Using 'small' Whisper model - Arabic accuracy will be poor!")
                 logger.warning("⚠️  For better results, set: WHISPER_MODEL=medium (or large-v3)")
-            logger.info(f"Loading Whisper model: {model_name}")
-            whisper_model = whisper.load_model(model_name)
+            if FASTER_WHISPER_AVAILABLE:
+                import ctranslate2
+                from faster_whisper import WhisperModel, BatchedInferencePipeline, decode_audio
+                device = WHISPER_DEVICE or ("cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu")
+                compute_type = "int8_float16" if device == "cuda" else "int8"
+                logger.info(f"Loading Whisper model: {model_name} (faster-whisper, {device}, {compute_type})")
+                whisper_model = WhisperModel(
+                    model_name,
+                    device=device,
+                    compute_type=compute_type,
+                    num_workers=WHISPER_WORKERS,
+                    # Each worker gets its own thread pool; split the cores
+                    cpu_threads=max(1, (os.cpu_count() or 1) // WHISPER_WORKERS),
+                )
+                # VAD-chunked batched decoding; WHISPER_BATCH_SIZE <= 1 disables it
+                if WHISPER_BATCH_SIZE > 1:
+                    whisper_pipeline = BatchedInferencePipeline(model=whisper_model)
+            else:
+                import torch
+                import whisper
+                device = WHISPER_DEVICE or ("cuda" if torch.cuda.is_available() else "cpu")
+                if device == "cuda":
+                    # TF32 tensor-core matmuls/convolutions for any remaining FP32 work
+                    torch.backends.cuda.matmul.allow_tf32 = True
+                    torch.backends.cudnn.allow_tf32 = True
+                    torch.backends.cudnn.benchmark = True
+                logger.info(f"Loading Whisper model: {model_name} (openai-whisper, {device})")
+                whisper_model = whisper.load_model(model_name, device=device)
             logger.info("Whisper model loaded successfully")
         except Exception as e:
             logger.error(f"Failed to load Whisper model: {e}")
@@ -102,6 +351,9 @@ def _initialize_voice_services():
     
     # Initialize Google services
     if GOOGLE_AVAILABLE:
+        from google.oauth2 import service_account
+        from google.cloud import translate_v3
+        from google.cloud import texttospeech
         gcp_credentials = _build_gcp_credentials()
         
         if gcp_credentials:
@@ -114,12 +366,6 @@ def _initialize_voice_services():
     
     # Determine overall availability
     VOICE_AVAILABLE = whisper_model is not None
-    
-    return VOICE_AVAILABLE
-
-
-# Initialize on module load
-_initialize_voice_services()
 
 
 class ArabicVoiceProcessor:
@@ -131,7 +377,9 @@ class ArabicVoiceProcessor:
     """
     
     def __init__(self):
+        _initialize_voice_services()
         self.whisper_model = whisper_model
+        self.whisper_pipeline = whisper_pipeline
         self.translate_client = translate_client
         self.tts_client = tts_client
         self.gcp_project_id = (
@@ -144,6 +392,12 @@ class ArabicVoiceProcessor:
         # Voice configuration
         self.default_voice = os.getenv("ARABIC_TTS_VOICE", "ar-XA-Wavenet-B")
         self.whisper_model_name = os.getenv("WHISPER_MODEL", "small")
+        
+        # (text, source, target) -> translation; (chunk, voice) -> MP3 bytes
+        self._translation_cache: "OrderedDict[tuple, str]" = OrderedDict()
+        self._tts_cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+        # voice name -> (VoiceSelectionParams, AudioConfig), built once per voice
+        self._tts_cfg_cache: Dict[str, tuple] = {}
     
     def is_available(self) -> Dict[str, bool]:
         """Check which voice services are available."""
@@ -179,23 +433,22 @@ class ArabicVoiceProcessor:
         if not t:
             return []
 
-        seps = ["。", ".", "؟", "!", "…", "،", "\n"]
         chunks: List[str] = []
-        cur = ""
+        start = 0
 
-        for ch in t:
-            cur += ch
-            if ch in seps and len(cur) >= 40:
-                chunks.append(cur.strip())
-                cur = ""
-            elif len(cur) >= max_chars:
-                chunks.append(cur.strip())
-                cur = ""
+        while start < len(t):
+            # A chunk ends at the first separator once it is 40+ chars long,
+            # or at max_chars, whichever comes first
+            end = start + max(max_chars, 1)
+            sep = _RE_TTS_SEPARATOR.search(t, start + 39, end - 1)
+            if sep:
+                end = sep.end()
+            chunk = t[start:end].strip()
+            if chunk:
+                chunks.append(chunk)
+            start = end
 
-        if cur.strip():
-            chunks.append(cur.strip())
-
-        return [c for c in chunks if c]
+        return chunks
     
     def _clean_for_tts(self, text: str) -> str:
         """
@@ -207,43 +460,9 @@ class ArabicVoiceProcessor:
         - Special formatting characters
         - Multiple spaces/newlines
         """
-        import re
-        
-        # Remove emojis (common Unicode ranges)
-        # Arabic emojis and common symbols
-        text = re.sub(r'[📊🔵💎🪨📐🎯📏✖️⭕🔲🔀📈🧭]', '', text)
-        # Remove other common emojis
-        text = re.sub(r'[\U0001F300-\U0001F9FF]', '', text)  # Emoji range
-        text = re.sub(r'[\U00002700-\U000027BF]', '', text)  # Dingbats
-        
-        # Remove markdown formatting
-        text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)  # **bold** -> bold
-        text = re.sub(r'\*([^*]+)\*', r'\1', text)     # *italic* -> italic
-        text = re.sub(r'`([^`]+)`', r'\1', text)        # `code` -> code
-        text = re.sub(r'#+\s*', '', text)                # Headers
-        
-        # Remove decorative lines (dashes, underscores, equals)
-        text = re.sub(r'[─━═─_]{3,}', '', text)  # Lines of 3+ dashes/equals
-        
-        # Remove analysis suggestions section (everything after "تحليل مكاني متاح" or similar)
-        # This section is interactive and shouldn't be read aloud
-        analysis_patterns = [
-            r'تحليل مكاني متاح.*$',  # "Spatial analysis available" and everything after
-            r'────────────────.*$',   # Decorative line and everything after
-            r'^\s*[٠١٢٣٤٥٦٧٨٩]\s*[\.\)]\s*.*$',  # Lines starting with Arabic numerals
-        ]
-        for pattern in analysis_patterns:
-            text = re.sub(pattern, '', text, flags=re.MULTILINE | re.DOTALL)
-        
-        # Remove Arabic numerals in circles/boxes at start of lines (like ١, ٢, ٣, ٤)
-        text = re.sub(r'^[\s]*[٠١٢٣٤٥٦٧٨٩]\s*[\.\)]\s*', '', text, flags=re.MULTILINE)
-        
-        # Remove bullet points and list markers
-        text = re.sub(r'^[\s]*[•·▪▫]\s*', '', text, flags=re.MULTILINE)
-        
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)  # Multiple spaces -> single space
-        text = re.sub(r'\n\s*\n', '\n', text)  # Multiple newlines -> single newline
+        text = text.translate(_TTS_STRIP_TABLE)
+        for pattern, replacement in _TTS_CLEAN_PATTERNS:
+            text = pattern.sub(replacement, text)
         
         # Remove leading/trailing whitespace from each line
         lines = [line.strip() for line in text.split('\n')]
@@ -253,8 +472,8 @@ class ArabicVoiceProcessor:
         text = text.strip()
         
         # Replace multiple periods/spaces with single period
-        text = re.sub(r'\.{2,}', '.', text)
-        text = re.sub(r'\s+', ' ', text)
+        text = _RE_TTS_PERIODS.sub('.', text)
+        text = _RE_TTS_WHITESPACE.sub(' ', text)
         
         return text
     
@@ -262,12 +481,49 @@ class ArabicVoiceProcessor:
     # Core Pipeline Steps
     # -------------------------------------------------------------------------
     
-    async def speech_to_english(self, audio_path: str) -> Dict[str, Any]:
+    def _transcribe(self, audio: Union[str, np.ndarray], **options) -> Dict[str, Any]:
+        """
+        Run Whisper on an audio file path or 16 kHz mono float32 samples,
+        with openai-whisper style options.
+        Returns a dict with "text" and "language" for either backend.
+        """
+        if FASTER_WHISPER_AVAILABLE:
+            if self.whisper_pipeline is not None:
+                segments, info = self.whisper_pipeline.transcribe(
+                    audio, batch_size=WHISPER_BATCH_SIZE, **options
+                )
+            else:
+                segments, info = self.whisper_model.transcribe(audio, **options)
+            return {
+                "text": "".join(segment.text for segment in segments),
+                "language": info.language
+            }
+        on_gpu = self.whisper_model.device.type == "cuda"
+        if on_gpu:
+            # Hand over a device tensor so the STFT and mel filterbank run on the GPU
+            if isinstance(audio, str):
+                audio = whisper.load_audio(audio)
+            audio = torch.from_numpy(audio).to(self.whisper_model.device)
+        # FP16 halves memory traffic on GPU; CPU inference has to stay FP32
+        with _openai_whisper_lock:
+            return self.whisper_model.transcribe(audio, fp16=on_gpu, **options)
+    
+    async def _transcribe_async(self, audio: Union[str, np.ndarray], **options) -> Dict[str, Any]:
+        """Run _transcribe on the Whisper worker threads."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _whisper_executor, functools.partial(self._transcribe, audio, **options)
+        )
+    
+    async def speech_to_english(self, audio: Union[str, bytes]) -> Dict[str, Any]:
         """
         Arabic speech -> English text using Whisper translate.
         
+        VOICE_STT_MODE selects two_step (Whisper Arabic transcript, then
+        Google Translate) or direct (one Whisper translate pass).
+        
         Args:
-            audio_path: Path to audio file
+            audio: Path to audio file, or raw audio bytes (faster-whisper only)
             
         Returns:
             Dict with english_text and metadata
@@ -275,13 +531,17 @@ class ArabicVoiceProcessor:
         if not self.whisper_model:
             return {
                 "success": False,
-                "error": "Whisper model not loaded. Install openai-whisper."
+                "error": "Whisper model not loaded. Install faster-whisper."
             }
         
         try:
             # Check file size
-            file_size = os.path.getsize(audio_path)
-            logger.info(f"Processing audio file: {audio_path} ({file_size} bytes)")
+            if isinstance(audio, bytes):
+                file_size = len(audio)
+                logger.info(f"Processing in-memory audio ({file_size} bytes)")
+            else:
+                file_size = os.path.getsize(audio)
+                logger.info(f"Processing audio file: {audio} ({file_size} bytes)")
             
             if file_size < 1000:
                 return {
@@ -289,20 +549,54 @@ class ArabicVoiceProcessor:
                     "error": "Audio file too small. Please record for longer."
                 }
             
+            # Decode once; every Whisper pass below reuses the samples
+            loop = asyncio.get_running_loop()
+            source = await loop.run_in_executor(_whisper_executor, _load_samples, audio)
+            duration = len(source) / WHISPER_SAMPLE_RATE
+            
+            # Short queries fit one window: there is no earlier window to
+            # condition on
+            short_audio = duration < SHORT_AUDIO_SECONDS
+            
+            if VOICE_STT_MODE == "direct":
+                # Single pass: Whisper decodes Arabic audio straight to English
+                logger.info("Translating Arabic audio to English (Whisper direct)...")
+                result = await self._transcribe_async(
+                    source,
+                    task="translate",
+                    language="ar",
+                    temperature=0.0,
+                    beam_size=5,
+                    condition_on_previous_text=not short_audio,
+                )
+                english_text = (result.get("text") or "").strip()
+                logger.info(f"Direct translation result: {english_text[:200] if english_text else 'EMPTY'}")
+                
+                if not english_text:
+                    return {
+                        "success": False,
+                        "error": "No speech detected. Please speak clearly and ensure your microphone is working."
+                    }
+                
+                return {
+                    "success": True,
+                    "english_text": english_text,
+                    "language_detected": result.get("language", "ar"),
+                    "model_used": self.whisper_model_name
+                }
+            
             # Two-step approach: Transcribe Arabic first, then translate
             # This is more accurate than direct translation
             logger.info("Step 1: Transcribing Arabic audio to Arabic text...")
             
             # First, transcribe Arabic to Arabic text (more accurate)
-            result = self.whisper_model.transcribe(
-                audio_path,
+            result = await self._transcribe_async(
+                source,
                 task="transcribe",  # Transcribe (not translate) - keeps original language
                 language="ar",      # Force Arabic
-                fp16=False,
                 temperature=0.0,
                 beam_size=5,
-                best_of=3,
-                condition_on_previous_text=True,
+                condition_on_previous_text=not short_audio,
                 initial_prompt="هذا كلام عربي عن مناجم الذهب والمعادن.",  # Arabic prompt to guide model
             )
             
@@ -314,11 +608,10 @@ class ArabicVoiceProcessor:
             if not arabic_text:
                 # Fallback: Try direct translation if transcription fails
                 logger.info("Transcription empty, trying direct translation...")
-                result = self.whisper_model.transcribe(
-                    audio_path,
+                result = await self._transcribe_async(
+                    source,
                     task="translate",
                     language="ar",
-                    fp16=False,
                     temperature=0.0,
                     beam_size=5,
                 )
@@ -335,11 +628,10 @@ class ArabicVoiceProcessor:
                 else:
                     # Fallback to direct Whisper translation
                     logger.warning("Google Translate failed, using Whisper direct translation...")
-                    result = self.whisper_model.transcribe(
-                        audio_path,
+                    result = await self._transcribe_async(
+                        source,
                         task="translate",
                         language="ar",
-                        fp16=False,
                         temperature=0.0,
                     )
                     english_text = (result.get("text") or "").strip()
@@ -370,16 +662,8 @@ class ArabicVoiceProcessor:
                 "error": f"Speech recognition failed: {str(e)}"
             }
     
-    async def translate_to_english(self, arabic_text: str) -> Dict[str, Any]:
-        """
-        Arabic -> English via Google Translate v3.
-        
-        Args:
-            arabic_text: Text in Arabic
-            
-        Returns:
-            Dict with english_text
-        """
+    def _translation_unavailable(self) -> Optional[Dict[str, Any]]:
+        """Error result if Google Translate can't be called, else None."""
         if not self.translate_client:
             return {
                 "success": False,
@@ -392,30 +676,65 @@ class ArabicVoiceProcessor:
                 "error": "GCP_PROJECT_ID is required for Translation"
             }
         
-        try:
-            parent = f"projects/{self.gcp_project_id}/locations/global"
-            
+        return None
+    
+    def _translate_texts(self, texts: List[str], source: str, target: str) -> List[str]:
+        """
+        Translate texts with one Translate v3 request per TRANSLATE_BATCH_SIZE strings.
+        Returns the translations in input order; cached texts are not re-sent.
+        """
+        parent = f"projects/{self.gcp_project_id}/locations/global"
+        translated: List[Optional[str]] = [
+            _cache_get(self._translation_cache, (text, source, target)) for text in texts
+        ]
+        missing = [i for i, text in enumerate(translated) if text is None]
+        
+        for start in range(0, len(missing), TRANSLATE_BATCH_SIZE):
+            batch = missing[start:start + TRANSLATE_BATCH_SIZE]
             response = self.translate_client.translate_text(
                 request={
                     "parent": parent,
-                    "contents": [arabic_text],
+                    "contents": [texts[i] for i in batch],
                     "mime_type": "text/plain",
-                    "source_language_code": "ar",
-                    "target_language_code": "en",
+                    "source_language_code": source,
+                    "target_language_code": target,
                 }
             )
+            for i, translation in zip(batch, response.translations):
+                translated[i] = (translation.translated_text or "").strip()
+                _cache_put(
+                    self._translation_cache, (texts[i], source, target),
+                    translated[i], TRANSLATION_CACHE_SIZE
+                )
+        
+        return [text for text in translated if text is not None]
+    
+    async def translate_to_english(self, arabic_text: str) -> Dict[str, Any]:
+        """
+        Arabic -> English via Google Translate v3.
+        
+        Args:
+            arabic_text: Text in Arabic
+            
+        Returns:
+            Dict with english_text
+        """
+        unavailable = self._translation_unavailable()
+        if unavailable:
+            return unavailable
+        
+        try:
+            translations = self._translate_texts([arabic_text], "ar", "en")
             
-            if not response.translations:
+            if not translations:
                 return {
                     "success": False,
                     "error": "Translation returned empty result"
                 }
             
-            english_text = (response.translations[0].translated_text or "").strip()
-            
             return {
                 "success": True,
-                "english_text": english_text,
+                "english_text": translations[0],
                 "source_text": arabic_text
             }
             
@@ -436,43 +755,59 @@ class ArabicVoiceProcessor:
         Returns:
             Dict with arabic_text
         """
-        if not self.translate_client:
+        unavailable = self._translation_unavailable()
+        if unavailable:
+            return unavailable
+        
+        try:
+            translations = self._translate_texts([english_text], "en", "ar")
+            
+            if not translations:
+                return {
+                    "success": False,
+                    "error": "Translation returned empty result"
+                }
+            
             return {
-                "success": False,
-                "error": "Google Translate client not initialized"
+                "success": True,
+                "arabic_text": translations[0],
+                "source_text": english_text
             }
-        
-        if not self.gcp_project_id:
+            
+        except Exception as e:
+            logger.error(f"Translation failed: {e}")
             return {
                 "success": False,
-                "error": "GCP_PROJECT_ID is required for Translation"
+                "error": f"Translation failed: {str(e)}"
             }
+    
+    async def translate_batch_to_arabic(self, english_texts: List[str]) -> Dict[str, Any]:
+        """
+        English -> Arabic for many texts at once via Google Translate v3.
         
-        try:
-            parent = f"projects/{self.gcp_project_id}/locations/global"
+        Args:
+            english_texts: Texts in English
             
-            response = self.translate_client.translate_text(
-                request={
-                    "parent": parent,
-                    "contents": [english_text],
-                    "mime_type": "text/plain",
-                    "source_language_code": "en",
-                    "target_language_code": "ar",
-                }
-            )
+        Returns:
+            Dict with arabic_texts (same order as english_texts)
+        """
+        unavailable = self._translation_unavailable()
+        if unavailable:
+            return unavailable
+        
+        try:
+            translations = self._translate_texts(list(english_texts), "en", "ar")
             
-            if not response.translations:
+            if len(translations) != len(english_texts):
                 return {
                     "success": False,
-                    "error": "Translation returned empty result"
+                    "error": "Translation returned incomplete result"
                 }
             
-            arabic_text = (response.translations[0].translated_text or "").strip()
-            
             return {
                 "success": True,
-                "arabic_text": arabic_text,
-                "source_text": english_text
+                "arabic_texts": translations,
+                "source_texts": list(english_texts)
             }
             
         except Exception as e:
@@ -482,10 +817,86 @@ class ArabicVoiceProcessor:
                 "error": f"Translation failed: {str(e)}"
             }
     
+    def _tts_config(self, voice_name: str) -> tuple:
+        """(voice, audio_config) request messages for a voice; they never change."""
+        config = self._tts_cfg_cache.get(voice_name)
+        if config is None:
+            voice = texttospeech.VoiceSelectionParams(
+                language_code="ar-XA",
+                name=voice_name
+            )
+            audio_config = texttospeech.AudioConfig(
+                audio_encoding=texttospeech.AudioEncoding.MP3
+            )
+            config = self._tts_cfg_cache[voice_name] = (voice, audio_config)
+        return config
+    
+    def _synthesize_chunk(self, chunk: str, voice_name: str) -> bytes:
+        """Synthesize one text chunk to MP3 (blocking gRPC call)."""
+        synthesis_input = texttospeech.SynthesisInput(text=chunk)
+        voice, audio_config = self._tts_config(voice_name)
+        
+        response = self.tts_client.synthesize_speech(
+            input=synthesis_input,
+            voice=voice,
+            audio_config=audio_config,
+        )
+        return response.audio_content
+    
+    async def _synthesize_chunk_async(
+        self, chunk: str, voice_name: str, semaphore: asyncio.Semaphore
+    ) -> bytes:
+        """Run _synthesize_chunk off the event loop, bounded by semaphore (cached)."""
+        cached = _cache_get(self._tts_cache, (chunk, voice_name))
+        if cached is not None:
+            return cached
+        
+        async with semaphore:
+            audio = await asyncio.to_thread(self._synthesize_chunk, chunk, voice_name)
+        _cache_put(self._tts_cache, (chunk, voice_name), audio, TTS_CACHE_SIZE)
+        return audio
+    
+    async def stream_arabic_speech(
+        self,
+        arabic_text: str,
+        voice_name: str = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Arabic text -> MP3 audio, yielded chunk by chunk in order.
+        
+        All chunks are synthesized concurrently; each is yielded as soon as it
+        and the ones before it are ready, so playback can start after the
+        first round trip instead of after the whole text.
+        
+        Args:
+            arabic_text: Text in Arabic
+            voice_name: TTS voice (default: ar-XA-Wavenet-B)
+            
+        Yields:
+            MP3 bytes per text chunk
+        """
+        voice_name = voice_name or self.default_voice
+        arabic_text = self._normalize_for_speech_ar(self._clean_for_tts(arabic_text))
+        chunks = self._chunk_for_tts(arabic_text, max_chars=300)
+        
+        semaphore = asyncio.Semaphore(TTS_MAX_CONCURRENCY)
+        tasks = [
+            asyncio.create_task(self._synthesize_chunk_async(chunk, voice_name, semaphore))
+            for chunk in chunks
+        ]
+        try:
+            for i, task in enumerate(tasks):
+                yield _mp3_stream_part(await task, i == 0)
+        finally:
+            # Client disconnected or a chunk failed: drop pending requests
+            for task in tasks:
+                task.cancel()
+    
     async def arabic_text_to_speech(
         self, 
         arabic_text: str, 
-        voice_name: str = None
+        voice_name: str = None,
+        encode: Literal["base64", "raw"] = "base64"
     ) -> Dict[str, Any]:
         """
         Arabic text -> MP3 audio via Google TTS.
@@ -493,9 +904,10 @@ class ArabicVoiceProcessor:
         Args:
             arabic_text: Text in Arabic
             voice_name: TTS voice (default: ar-XA-Wavenet-B)
+            encode: "base64" for JSON responses, "raw" for binary transports
             
         Returns:
-            Dict with audio_base64
+            Dict with audio_base64 (or audio_bytes when encode="raw")
         """
         if not self.tts_client:
             return {
@@ -521,39 +933,28 @@ class ArabicVoiceProcessor:
                     "error": "No text to synthesize"
                 }
             
-            # Generate audio for each chunk
-            mp3_parts: List[bytes] = []
-            
-            for chunk in chunks:
-                synthesis_input = texttospeech.SynthesisInput(text=chunk)
-                voice = texttospeech.VoiceSelectionParams(
-                    language_code="ar-XA",
-                    name=voice_name
-                )
-                audio_config = texttospeech.AudioConfig(
-                    audio_encoding=texttospeech.AudioEncoding.MP3
-                )
-                
-                response = self.tts_client.synthesize_speech(
-                    input=synthesis_input,
-                    voice=voice,
-                    audio_config=audio_config,
-                )
-                mp3_parts.append(response.audio_content)
+            # Generate audio for all chunks concurrently (gather keeps chunk order)
+            semaphore = asyncio.Semaphore(TTS_MAX_CONCURRENCY)
+            mp3_parts: List[bytes] = await asyncio.gather(
+                *(self._synthesize_chunk_async(chunk, voice_name, semaphore) for chunk in chunks)
+            )
             
-            # Combine all parts
-            audio_bytes = b"".join(mp3_parts)
-            audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
+            # Combine all parts (one ID3 tag, no per-part Xing/Info frames)
+            audio_bytes = _join_mp3_parts(mp3_parts)
             
-            return {
+            result = {
                 "success": True,
-                "audio_base64": audio_base64,
                 "audio_format": "mp3",
                 "voice_used": voice_name,
                 "text_length": len(arabic_text),
                 "chunks_count": len(chunks),
                 "audio_size_bytes": len(audio_bytes)
             }
+            if encode == "raw":
+                result["audio_bytes"] = audio_bytes
+            else:
+                result["audio_base64"] = _b64encode(audio_bytes)
+            return result
             
         except Exception as e:
             logger.error(f"TTS failed: {e}")
@@ -589,6 +990,28 @@ class ArabicVoiceProcessor:
         Returns:
             Dict with english_query ready for agent
         """
+        if FASTER_WHISPER_AVAILABLE:
+            # faster-whisper decodes from memory: no temp file round trip
+            logger.info(f"Decoding audio in memory ({len(audio_data)} bytes, format: {audio_format})")
+            stt_result = await self.speech_to_english(audio_data)
+        else:
+            stt_result = await self._speech_to_english_via_file(audio_data, audio_format)
+        
+        if not stt_result.get("success"):
+            return stt_result
+        
+        english_query = stt_result["english_text"]
+        
+        return {
+            "success": True,
+            "english_query": english_query,
+            "original_language": "ar",
+            "ready_for_agent": True,
+            "whisper_model": stt_result.get("model_used")
+        }
+    
+    async def _speech_to_english_via_file(self, audio_data: bytes, audio_format: str) -> Dict[str, Any]:
+        """speech_to_english for openai-whisper, which decodes audio with ffmpeg from a file."""
         # Determine correct file extension based on format
         format_to_ext = {
             "webm": ".webm",
@@ -607,22 +1030,7 @@ class ArabicVoiceProcessor:
         logger.info(f"Saved audio to {tmp_path} ({len(audio_data)} bytes, format: {audio_format})")
         
         try:
-            # Step 1: Arabic speech -> English text
-            stt_result = await self.speech_to_english(tmp_path)
-            
-            if not stt_result.get("success"):
-                return stt_result
-            
-            english_query = stt_result["english_text"]
-            
-            return {
-                "success": True,
-                "english_query": english_query,
-                "original_language": "ar",
-                "ready_for_agent": True,
-                "whisper_model": stt_result.get("model_used")
-            }
-            
+            return await self.speech_to_english(tmp_path)
         finally:
             # Clean up temp file
             try:
@@ -634,7 +1042,8 @@ class ArabicVoiceProcessor:
         self,
         english_response: str,
         voice_name: str = None,
-        return_audio: bool = True
+        return_audio: bool = True,
+        encode: Literal["base64", "raw"] = "base64"
     ) -> Dict[str, Any]:
         """
         Convert agent's English response to Arabic audio.
@@ -647,9 +1056,10 @@ class ArabicVoiceProcessor:
             english_response: The agent's response in English
             voice_name: TTS voice
             return_audio: Whether to generate audio
+            encode: "base64" for JSON responses, "raw" for binary transports
             
         Returns:
-            Dict with arabic_text and audio_base64
+            Dict with arabic_text and audio_base64 (or audio_bytes)
         """
         result = {
             "success": True,
@@ -670,10 +1080,11 @@ class ArabicVoiceProcessor:
         # Step 2: Generate audio (if requested and TTS available)
         if return_audio and self.tts_client:
             arabic_text = result.get("arabic_text", english_response)
-            tts_result = await self.arabic_text_to_speech(arabic_text, voice_name)
+            tts_result = await self.arabic_text_to_speech(arabic_text, voice_name, encode=encode)
             
             if tts_result.get("success"):
-                result["audio_base64"] = tts_result["audio_base64"]
+                audio_key = "audio_bytes" if encode == "raw" else "audio_base64"
+                result[audio_key] = tts_result[audio_key]
                 result["audio_format"] = tts_result["audio_format"]
                 result["voice_used"] = tts_result["voice_used"]
             else:
@@ -687,7 +1098,8 @@ class ArabicVoiceProcessor:
         audio_data: bytes,
         agent_callback,
         audio_format: str = "webm",
-        voice_name: str = None
+        voice_name: str = None,
+        encode: Literal["base64", "raw"] = "base64"
     ) -> Dict[str, Any]:
         """
         Complete voice interaction pipeline:
@@ -702,6 +1114,7 @@ class ArabicVoiceProcessor:
             agent_callback: async function(english_query) -> english_response
             audio_format: Format of the input audio (webm, wav, mp3)
             voice_name: TTS voice for response
+            encode: "base64" for JSON responses, "raw" for binary transports
             
         Returns:
             Complete result with all intermediate steps
@@ -736,9 +1149,12 @@ class ArabicVoiceProcessor:
         response_result = await self.create_arabic_response(
             english_response,
             voice_name=voice_name,
-            return_audio=True
+            return_audio=True,
+            encode=encode
         )
         
+        audio_key = "audio_bytes" if encode == "raw" else "audio_base64"
+        
         # Combine all results
         return {
             "success": True,
@@ -750,7 +1166,7 @@ class ArabicVoiceProcessor:
             "output": {
                 "english_response": english_response,
                 "arabic_text": response_result.get("arabic_text"),
-                "audio_base64": response_result.get("audio_base64"),
+                audio_key: response_result.get(audio_key),
                 "audio_format": response_result.get("audio_format", "mp3"),
                 "voice_used": response_result.get("voice_used")
             }
@@ -782,11 +1198,14 @@ class ArabicVoiceProcessor:
 
 # Global instance
 _arabic_voice_processor: Optional[ArabicVoiceProcessor] = None
+_arabic_voice_processor_lock = threading.Lock()
 
 
 def get_arabic_voice_processor() -> ArabicVoiceProcessor:
     """Get or create the global Arabic voice processor."""
     global _arabic_voice_processor
     if _arabic_voice_processor is None:
-        _arabic_voice_processor = ArabicVoiceProcessor()
+        with _arabic_voice_processor_lock:
+            if _arabic_voice_processor is None:
+                _arabic_voice_processor = ArabicVoiceProcessor()
     return _arabic_voice_processor